@@ -5,7 +5,11 @@ from dotenv import load_dotenv
 import llm_client
 from streamlit_agraph import agraph, Node, Edge, Config
 import strategist
+import roadmap
+import graph_layout
+import job_queue
 import utils
+import geo
 
 # Load environment variables
 load_dotenv()
@@ -39,6 +43,12 @@ with st.sidebar:
         help="Lite = Viral Focus (15 nodes). Pro = Authority Focus (30 nodes). Empire = Total Niche Domination (70+ nodes)."
     )
     
+    graph_layout_choice = st.selectbox(
+        "Graph Layout",
+        graph_layout.LAYOUTS,
+        help="Auto = live physics for small graphs, a precomputed radial layout for large (Empire) graphs."
+    )
+    
     run_btn = st.button("🚀 Initialize Strategy Engine")
     
     st.markdown("---")
@@ -47,16 +57,9 @@ with st.sidebar:
     st.markdown("### 💎 Unlock Full Access")
     
     # 1. Geo-Detection
-    # We use a simple try-except block to avoid crashing if the API fails
-    user_country = "US" # Default to International
-    try:
-        import requests
-        response = requests.get('https://ipapi.co/json/', timeout=3)
-        if response.status_code == 200:
-            data = response.json()
-            user_country = data.get('country_code', 'US')
-    except:
-        pass # Fallback to US if offline or API error
+    # Cached per session and resolved off the script thread; falls back to
+    # the browser's Accept-Language region, then US (International)
+    user_country = geo.get_user_country()
         
     # 2. Dynamic Button Rendering
     if user_country == "NG":
@@ -80,119 +83,75 @@ with st.sidebar:
         </a>
         """, unsafe_allow_html=True)
 
+def build_graph(parsed, layout):
+    """Builds agraph nodes/edges/config for a parsed roadmap and a resolved layout."""
+    positions = graph_layout.compute(parsed, layout)
+    node_kwargs, edge_kwargs = graph_layout.graph_elements(parsed, positions)
+    nodes = [Node(**kwargs) for kwargs in node_kwargs]
+    edges = [Edge(**kwargs) for kwargs in edge_kwargs]
+    return nodes, edges, Config(**graph_layout.config_options(layout))
+
 if run_btn and niche and api_key:
-    with st.spinner("🕵️ The Strategist is analyzing the web... (This may take 1-2 mins)"):
-        # 1. Run the existing text-based strategist
-        roadmap_text = strategist.generate_roadmap(niche, user_url, manual_competitors, api_key, strategy_depth)
-        
-        st.session_state['roadmap_text'] = roadmap_text
-        st.session_state['graph_generated'] = True
-        st.rerun()
+    # 1. Run the strategist in the background (Markdown report + structured JSON hierarchy).
+    # Reruns only poll the job; an identical run with the same API key is shared.
+    st.session_state['roadmap_job'] = job_queue.get_queue().submit(
+        "roadmap", strategist.roadmap_job,
+        args=(niche, user_url, manual_competitors, strategy_depth),
+        kwargs={"api_key": api_key},
+        with_job=True
+    )
+    st.session_state['roadmap_niche'] = niche
+
+job = utils.poll_job('roadmap_job', "🕵️ The Strategist is analyzing the web... (This may take 1-2 mins)")
+if job and job['status'] != "done":
+    st.error(f"Roadmap generation failed: {job['error']}")
+elif job:
+    # Parse once; the graph and the Word export are derived from this model, not from re-scanning text per rerun
+    parsed = roadmap.parse(job['result'], st.session_state.get('roadmap_niche', niche))
+    st.session_state['roadmap'] = parsed
+    st.session_state['roadmap_text'] = parsed.markdown
+    st.session_state['roadmap_graphs'] = {} # resolved layout -> (nodes, edges, config), built on first use
+    # The Word export keeps the whole report; its topic sections come from the parsed hierarchy
+    st.session_state['roadmap_docx'] = utils.create_docx(parsed.to_docx_markdown()).getvalue()
+    st.session_state['graph_generated'] = True
+    st.rerun()
 
 # Display Results if generated
 if st.session_state.get('graph_generated'):
     st.success("Analysis Complete!")
     
+    parsed = st.session_state['roadmap']
     roadmap_text = st.session_state['roadmap_text']
     
     # 2. Visualize the Graph
     st.subheader("Interactive Content Graph")
     
-    nodes = []
-    edges = []
-    
-    # Helper to truncate labels
-    def truncate(text, limit=25):
-        return text[:limit] + "..." if len(text) > limit else text
-
-    # Central Node (The Niche)
-    nodes.append(Node(id="ROOT", label=niche, size=50, color="#FFD700", font={'size': 24, 'color': 'black', 'face': 'arial'})) # Gold, Big Hub
-
-    # Parse the roadmap text
-    lines = roadmap_text.split('\n')
-    current_pillar = None
-    
-    for line in lines:
-        line = line.strip()
-        # Pillars are usually "### 🏛️ Pillar 1: Name"
-        if "Pillar" in line and "###" in line:
-            # Extract name: Remove ###, Pillar X:, and emojis
-            pillar_name = line.replace("###", "").split(":")[-1].strip()
-            node_id = f"P_{pillar_name}"
-            
-            # Pillar Node (Medium Hub)
-            nodes.append(Node(id=node_id, label=truncate(pillar_name), title=pillar_name, size=35, color="#1E90FF", font={'size': 18, 'color': 'white', 'face': 'arial'})) 
-            edges.append(Edge(source="ROOT", target=node_id, width=3, color="#A9A9A9")) # Thicker edge
-            current_pillar = node_id
-            
-        # Topics are usually "#### 1. Title" or "#### [OPPORTUNITY] Title"
-        elif "####" in line and current_pillar:
-            # Extract name: Remove ####
-            raw_name = line.replace("####", "").strip()
-            
-            # Check for Opportunity Tag
-            is_opportunity = "[OPPORTUNITY]" in raw_name
-            
-            # Clean Name
-            topic_name = raw_name.replace("[OPPORTUNITY]", "").strip()
-            # Remove leading numbers like "1. "
-            if topic_name[0].isdigit() and "." in topic_name:
-                parts = topic_name.split(".", 1)
-                if len(parts) > 1:
-                    topic_name = parts[1].strip()
-            
-            node_id = f"T_{topic_name}"
-            
-            # Logic to determine Color
-            # Opportunity = Gold/Orange (High Demand)
-            # Standard = Green (Safe/Standard)
-            if is_opportunity:
-                color = "#FF8C00" # Dark Orange / Gold
-                label = f"🔥 {truncate(topic_name)}"
-                size = 25
-            else:
-                color = "#00C851" # Green
-                label = truncate(topic_name)
-                size = 20
-            
-            # Topic Node (Leaf)
-            nodes.append(Node(id=node_id, label=label, title=topic_name, size=size, color=color, font={'size': 14, 'color': 'white', 'face': 'arial'}))
-            edges.append(Edge(source=current_pillar, target=node_id, width=1, color="#D3D3D3"))
-
-    config = Config(
-        width=None, 
-        height=800, 
-        directed=True, 
-        physics=True, 
-        hierarchical=False,
-        node={'labelProperty': 'label', 'renderLabel': True},
-        edges={'smooth': False}, 
-        physicsOptions={
-            "barnesHut": {
-                "gravitationalConstant": -10000, 
-                "centralGravity": 0.1, 
-                "springLength": 250, 
-                "springConstant": 0.01,
-                "damping": 0.09,
-                "avoidOverlap": 1
-            },
-            "minVelocity": 0.75
-        }
-    )
-    
-    # Render Graph
-    return_value = agraph(nodes=nodes, edges=edges, config=config)
+    if not parsed.pillars:
+        st.warning("Could not extract a content hierarchy from the roadmap, so there is no graph to show.")
+    else:
+        if parsed.source != "json":
+            st.caption("ℹ️ Structured output was missing; the graph was rebuilt from the report headings.")
+        st.caption(f"{len(parsed.pillars)} pillars · {parsed.topic_count} topics · {len(parsed.opportunities())} opportunities")
+        
+        # Layouts are computed once per roadmap and reused across reruns
+        layout = graph_layout.choose_layout(parsed, graph_layout_choice)
+        graphs = st.session_state['roadmap_graphs']
+        if layout not in graphs:
+            graphs[layout] = build_graph(parsed, layout)
+        nodes, edges, config = graphs[layout]
+        
+        # Render Graph
+        return_value = agraph(nodes=nodes, edges=edges, config=config)
     
     # 3. Show Roadmap Text
     st.markdown("---")
     st.subheader("📄 Detailed Content Roadmap")
     st.markdown(roadmap_text)
     
-    # Word Download
-    docx_file = utils.create_docx(roadmap_text)
+    # Word Download (built once, when the roadmap was parsed)
     st.download_button(
         "📄 Download Roadmap (Word Doc)",
-        docx_file,
+        st.session_state['roadmap_docx'],
         "content_roadmap.docx",
         "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
     )
@@ -200,6 +159,8 @@ if st.session_state.get('graph_generated'):
     if st.button("Reset Analysis"):
         st.session_state['graph_generated'] = False
         st.session_state['roadmap_text'] = ""
+        for key in ('roadmap', 'roadmap_graphs', 'roadmap_docx'):
+            st.session_state.pop(key, None)
         st.rerun()
 
 # Show Impact Metrics on every page load (at the bottom)
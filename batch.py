@@ -0,0 +1,348 @@
+"""
+STRATOS batch runner: research + content generation for many items, headless.
+
+Reads items from a CSV (header row) or JSONL file. Each item is one of:
+    topic  -> deep research, then content       (columns: topic, optional url as reference)
+    url    -> scrape + analyse a URL, then content (columns: url)
+    niche  -> Strategist roadmap                (columns: niche, optional user_url, competitors)
+The kind comes from a `type` column, or is inferred (niche > topic > url).
+Optional columns: id (reduced to a-z, 0-9 and "-", as it names the output files),
+platforms ("LinkedIn; X (Twitter)"), strategy_depth.
+
+Progress is checkpointed to <out>/checkpoint.jsonl after every item, so an
+interrupted run picks up where it stopped when started again with the same
+--out directory.
+
+Usage:
+    python batch.py topics.csv --out batch_output --workers 4 --rate 20
+    python batch.py items.jsonl --formats md,docx,jsonl --retry-failed
+"""
+import os
+import re
+import csv
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+import concurrent.futures
+from dotenv import load_dotenv
+import llm_client
+import researcher
+import strategist
+import roadmap
+import utils
+
+DEFAULT_PLATFORMS = ["Blog Post 1"]
+FORMATS = ("md", "docx", "jsonl")
+
+class RateLimiter:
+    """Token bucket: at most `per_minute` acquisitions per minute (bursts up to `burst`)."""
+    def __init__(self, per_minute, burst=1):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        while True:
+            with self._lock:
+                now = time.time()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) * self.interval
+            time.sleep(wait)
+
+class Checkpoint:
+    """
+    Append-only record of finished items (one JSON line each), safe to resume from after a crash.
+    `lock` is reentrant so a results line and its checkpoint entry can be written under one hold.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.status = {}
+        self.lock = threading.RLock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line from a crash
+                    self.status[entry["id"]] = entry["status"]
+
+    def record(self, item_id, status, **fields):
+        with self.lock:
+            self.status[item_id] = status
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(dict(id=item_id, status=status, time=time.time(), **fields), ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")[:40]
+
+def _short_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:8]
+
+def load_items(path):
+    """Reads CSV or JSONL rows into item dicts with an id and a kind."""
+    with open(path, "r", encoding="utf-8-sig") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+
+    items = []
+    seen = set()
+    for row in rows:
+        # JSONL values may be numbers / booleans / null; lists are kept (e.g. platforms)
+        row = {str(k).strip().lower(): (v if isinstance(v, list) else "" if v is None else str(v).strip())
+               for k, v in row.items() if k}
+        kind = row.get("type", "").lower() or ("niche" if row.get("niche") else "topic" if row.get("topic") else "url")
+        subject = row.get(kind) or ""
+        if not subject or not isinstance(subject, str):
+            print(f"  ⚠️ Skipping row without a {kind}: {row}")
+            continue
+        # Ids become file names, so supplied ones go through the same slug as generated ones (no '../').
+        # A slug that changed or cut the id gets a hash of the raw id, so "A/1" and "a-1" stay distinct.
+        raw_id = row.get("id", "")
+        if not isinstance(raw_id, str):
+            raw_id = json.dumps(raw_id)
+        item_id = _slug(raw_id)
+        if item_id and item_id != raw_id:
+            item_id += "-" + _short_hash(raw_id)
+        elif not item_id:
+            item_id = _slug(subject) + "-" + _short_hash(json.dumps(row, sort_keys=True))
+        if item_id in seen:
+            print(f"  ⚠️ Skipping duplicate row (id '{item_id}' already used): {row}")
+            continue
+        seen.add(item_id)
+        items.append({"id": item_id, "kind": kind, "row": row})
+    return items
+
+def load_system_prompt():
+    try:
+        with open(os.path.join(os.path.dirname(__file__), "prompts", "master_system_prompt.txt"), "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return "You are an expert copywriter."
+
+def _split_list(value):
+    if isinstance(value, list):
+        return value
+    return [v.strip() for v in re.split(r"[;|]", value or "") if v.strip()]
+
+def generate_content(topic, scraped_data, keywords, platforms, system_instruction, api_key):
+    user_message = f"""
+TOPIC: {topic}
+SCRAPED CONTEXT (Facts/News): {scraped_data}
+SEO KEYWORDS: {keywords}
+
+You must generate content ONLY for the following selected platforms:
+{', '.join(platforms)}
+
+IMPORTANT INSTRUCTION FOR "AEO Answer Card":
+You MUST follow the strict format:
+1. Start with a Direct Definition (No Intro).
+2. Use Question Headers.
+3. End with an FAQ Section.
+If you fail this structure, the content is useless.
+"""
+    response = llm_client.SMART_FALLBACK.generate(user_message, system_instruction=system_instruction, api_key=api_key)
+    tokens_in = response.input_tokens or llm_client.count_prompt_tokens(user_message, system_instruction)
+    tokens_out = response.output_tokens or llm_client.count_tokens(response.text)
+    return response.text, tokens_in, tokens_out
+
+def run_item(item, args, api_key, system_instruction):
+    """
+    Runs one item end to end. Returns (markdown, record for results.jsonl).
+    The record's tokens_in / tokens_out cover the final generation call only;
+    run-wide throughput counts every LLM call (see llm_client.USAGE).
+    """
+    row = item["row"]
+    record = {"id": item["id"], "kind": item["kind"], "input": row}
+
+    if item["kind"] == "niche":
+        text = strategist.generate_roadmap(
+            row["niche"], row.get("user_url", ""), _split_list(row.get("competitors")), api_key,
+            row.get("strategy_depth") or args.strategy_depth
+        )
+        if text.startswith("Error:"):
+            raise RuntimeError(text)
+        parsed = roadmap.parse(text, row["niche"])
+        # The roadmap prompt is built inside strategist; only the streamed answer is measured here
+        record.update(roadmap=parsed.to_dict(), tokens_out=llm_client.count_tokens(text))
+        return parsed.markdown, record
+
+    if item["kind"] == "url":
+        topic = "Analysis of " + row["url"]
+        scraped_data, keywords, sources = researcher.process_url(row["url"], api_key)
+        if not sources:
+            # process_url reports a failed scrape in place of the content
+            raise RuntimeError(f"{scraped_data} ({row['url']})")
+    else:
+        topic = row["topic"]
+        scraped_data, keywords, sources = researcher.research_topic(topic, api_key, reference_url=row.get("url") or None)
+
+    platforms = _split_list(row.get("platforms")) or args.platforms
+    content, tokens_in, tokens_out = generate_content(topic, scraped_data, keywords, platforms, system_instruction, api_key)
+
+    references = "\n\n## References\n" + "".join(f"- [{s.get('title', 'Source')}]({s['href']})\n" for s in sources)
+    record.update(topic=topic, keywords=keywords, sources=sources, platforms=platforms, tokens_in=tokens_in, tokens_out=tokens_out)
+    return content + references, record
+
+def write_outputs(item_id, markdown, args):
+    """Writes the per-item files (md / docx). Returns their paths."""
+    paths = {}
+    if "md" in args.formats:
+        paths["md"] = os.path.join(args.out, f"{item_id}.md")
+        with open(paths["md"], "w", encoding="utf-8") as f:
+            f.write(markdown)
+    if "docx" in args.formats:
+        paths["docx"] = os.path.join(args.out, f"{item_id}.docx")
+        with open(paths["docx"], "wb") as f:
+            f.write(utils.create_docx(markdown).getvalue())
+    return paths
+
+def append_result(path, record, markdown, paths):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(dict(record, content=markdown, files=paths), ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def compact_results(path, checkpoint):
+    """
+    Keeps one results.jsonl line per item checkpointed as done (the last one).
+    A crash between appending a result and checkpointing it leaves a line for
+    an item that will run again; this drops it (and torn lines) before resuming.
+    """
+    if not os.path.exists(path):
+        return 0
+    kept = {}
+    total = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            total += 1
+            try:
+                item_id = json.loads(line)["id"]
+            except (ValueError, KeyError, TypeError):
+                continue
+            if checkpoint.status.get(item_id) == "done":
+                kept.pop(item_id, None)  # The last line for an id wins, in file order
+                kept[item_id] = line if line.endswith("\n") else line + "\n"
+    if len(kept) == total:
+        return 0
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.writelines(kept.values())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return total - len(kept)
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch research + content generation from a CSV / JSONL file.")
+    parser.add_argument("input", help="CSV (with header) or JSONL file of items")
+    parser.add_argument("--out", default="batch_output", help="Output directory (also holds the checkpoint)")
+    parser.add_argument("--workers", type=int, default=3, help="Items processed concurrently")
+    parser.add_argument("--rate", type=float, default=0, help="Max items started per minute (0 = unlimited)")
+    parser.add_argument("--formats", default="md,jsonl", help=f"Comma-separated outputs: {', '.join(FORMATS)}")
+    parser.add_argument("--platforms", default=";".join(DEFAULT_PLATFORMS), help="Default platforms, ';'-separated")
+    parser.add_argument("--strategy-depth", default="Pro (Balanced)", help="Default depth for niche items")
+    parser.add_argument("--retry-failed", action="store_true", help="Re-run items that failed in a previous run")
+    parser.add_argument("--limit", type=int, default=0, help="Process at most N pending items")
+    args = parser.parse_args()
+
+    args.formats = {f.strip() for f in args.formats.split(",") if f.strip()}
+    unknown = args.formats - set(FORMATS)
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(sorted(unknown))}")
+    args.platforms = _split_list(args.platforms)
+
+    load_dotenv()
+    api_key = llm_client.get_api_key()
+    if not api_key:
+        print("Error: OPENROUTER_API_KEY not found in environment variables.")
+        return 1
+
+    os.makedirs(args.out, exist_ok=True)
+    checkpoint = Checkpoint(os.path.join(args.out, "checkpoint.jsonl"))
+    results_path = os.path.join(args.out, "results.jsonl")
+    dropped = compact_results(results_path, checkpoint)
+    if dropped:
+        print(f"  🧹 Dropped {dropped} results.jsonl line(s) from an interrupted run")
+    items = load_items(args.input)
+    skip = {"done", "failed"} if not args.retry_failed else {"done"}
+    pending = [item for item in items if checkpoint.status.get(item["id"]) not in skip]
+    if args.limit:
+        pending = pending[:args.limit]
+    print(f"🚀 {len(items)} items, {len(items) - len(pending)} already checkpointed, {len(pending)} to run "
+          f"({args.workers} workers{f', {args.rate:g}/min' if args.rate else ''})")
+    if not pending:
+        return 0
+
+    system_instruction = load_system_prompt()
+    limiter = RateLimiter(args.rate, burst=max(1, args.workers))
+    totals = {"done": 0, "failed": 0}
+    started = time.time()
+    usage_start = llm_client.USAGE.snapshot()
+    
+    def llm_tokens():
+        """Tokens of every LLM call made since the run started (research, analysis and generation; cache hits excluded)."""
+        _, tokens_in, tokens_out = llm_client.USAGE.snapshot()
+        return tokens_in - usage_start[1] + tokens_out - usage_start[2]
+
+    def work(item):
+        limiter.acquire()
+        item_started = time.time()
+        markdown, record = run_item(item, args, api_key, system_instruction)
+        record["seconds"] = round(time.time() - item_started, 2)
+        paths = write_outputs(item["id"], markdown, args)
+        tokens = record.get("tokens_in", 0) + record.get("tokens_out", 0)
+        # The results line and its checkpoint entry are written back to back under one lock
+        with checkpoint.lock:
+            if "jsonl" in args.formats:
+                append_result(results_path, record, markdown, paths)
+            checkpoint.record(item["id"], "done", seconds=record["seconds"], generation_tokens=tokens)
+        return record
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, args.workers))
+    futures = {executor.submit(work, item): item for item in pending}
+    try:
+        for n, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            item = futures[future]
+            try:
+                record = future.result()
+                tokens = record.get("tokens_in", 0) + record.get("tokens_out", 0)
+                totals["done"] += 1
+                outcome = f"✅ {item['id']} ({record['seconds']:.0f}s, {tokens:,} generation tokens)"
+            except Exception as e:
+                totals["failed"] += 1
+                checkpoint.record(item["id"], "failed", error=str(e))
+                outcome = f"❌ {item['id']}: {e}"
+            minutes = max(time.time() - started, 1e-6) / 60
+            print(f"[{n}/{len(pending)}] {outcome} | {totals['done'] / minutes:.2f} items/min · {llm_tokens() / minutes:,.0f} LLM tokens/min")
+    except KeyboardInterrupt:
+        print("\n⏹️ Interrupted; finished items are checkpointed. Re-run the same command to resume.")
+        executor.shutdown(wait=False, cancel_futures=True)
+        return 130
+    executor.shutdown(wait=True)
+
+    minutes = (time.time() - started) / 60
+    calls = llm_client.USAGE.snapshot()[0] - usage_start[0]
+    print(f"\n✅ Batch complete: {totals['done']} done, {totals['failed']} failed in {minutes:.1f} min "
+          f"({totals['done'] / max(minutes, 1e-6):.2f} items/min, {llm_tokens() / max(minutes, 1e-6):,.0f} LLM tokens/min "
+          f"over {calls:,} calls). "
+          f"Outputs in {args.out}/")
+    return 0 if not totals["failed"] else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
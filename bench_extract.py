@@ -0,0 +1,97 @@
+"""
+Benchmark: HTML-to-text extraction.
+
+Compares the legacy BeautifulSoup (html.parser) scraper logic against the
+streaming extractor (every available backend) on a corpus of saved HTML pages.
+
+Usage:
+    python bench_extract.py --corpus path/to/html_pages   # *.html / *.htm files
+    python bench_extract.py                               # synthetic corpus
+"""
+import os
+import time
+import glob
+import random
+import argparse
+import tracemalloc
+from bs4 import BeautifulSoup
+import extractor
+
+def legacy_extract(html):
+    """The original researcher.scrape_content parsing logic."""
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup(["script", "style", "nav", "footer", "header", "aside", "iframe"]):
+        script.decompose()
+    text = soup.get_text(separator=' ', strip=True)
+    text = ' '.join(text.split())
+    return text[:3000] + "..." if len(text) > 3000 else text
+
+def synthetic_corpus(count=40, seed=7):
+    """Builds pages shaped like real articles: heavy head/nav, long body, footer."""
+    rng = random.Random(seed)
+    words = ("solar energy market growth panel battery storage grid policy price demand "
+             "installation efficiency research report analysis customer cost").split()
+
+    def sentence():
+        return " ".join(rng.choice(words) for _ in range(rng.randint(8, 20))).capitalize() + "."
+
+    pages = []
+    for i in range(count):
+        head = "<script>" + "var x = 1;" * rng.randint(200, 2000) + "</script>"
+        nav = "<nav>" + "".join(f"<a href='/{j}'>Menu {j}</a>" for j in range(rng.randint(20, 80))) + "</nav>"
+        body = "".join(
+            f"<h2>Section {j}</h2>" + "".join(f"<p>{' '.join(sentence() for _ in range(5))}</p>" for _ in range(5))
+            for j in range(rng.randint(5, 60))
+        )
+        footer = "<footer>" + "".join(f"<a href='/f{j}'>Footer link {j}</a>" for j in range(50)) + "</footer>"
+        html = f"<html><head><title>Page {i}</title>{head}</head><body>{nav}<article>{body}</article>{footer}</body></html>"
+        pages.append(html.encode("utf-8"))
+    return pages
+
+def load_corpus(directory):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.htm*"))):
+        with open(path, "rb") as f:
+            pages.append(f.read())
+    return pages
+
+def run(name, fn, pages, repeat):
+    # Throughput
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            fn(page)
+    elapsed = time.perf_counter() - start
+
+    # Peak memory for a single pass
+    tracemalloc.start()
+    for page in pages:
+        fn(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total_bytes = sum(len(p) for p in pages) * repeat
+    pages_per_sec = len(pages) * repeat / elapsed
+    mb_per_sec = total_bytes / elapsed / 1e6
+    print(f"{name:<28} {pages_per_sec:>10.1f} pages/s {mb_per_sec:>8.2f} MB/s {peak / 1e6:>9.2f} MB peak")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML-to-text extraction.")
+    parser.add_argument("--corpus", help="Directory of saved .html pages (default: synthetic corpus)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not pages:
+        print("No pages found.")
+        return
+    print(f"Corpus: {len(pages)} pages, {sum(len(p) for p in pages) / 1e6:.2f} MB\n")
+
+    run("legacy (bs4 html.parser)", legacy_extract, pages, args.repeat)
+    for backend in extractor.BACKENDS:
+        run(f"streaming ({backend})",
+            lambda page, b=backend: extractor.extract(page, budget=3000, backend=b, suffix="..."),
+            pages, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: content-graph layout.
+
+Builds synthetic roadmaps of 10/50/200/1000 nodes and, for each layout
+(browser physics vs precomputed radial / hierarchical), measures the time
+to compute positions and build the graph in Python, the JSON payload sent
+to the graph component, and the closest distance between any two nodes
+(a crude overlap check; physics positions are decided in the browser).
+
+Usage:
+    python bench_layout.py
+    python bench_layout.py --sizes 50 1000 --repeat 20
+"""
+import math
+import time
+import random
+import argparse
+import roadmap
+import graph_layout
+
+def synthetic_roadmap(total_nodes, seed=7):
+    """A roadmap with ~sqrt(n) pillars and the remaining nodes spread unevenly as topics."""
+    rng = random.Random(seed)
+    n_pillars = max(1, int(math.sqrt(total_nodes - 1)))
+    n_topics = max(0, total_nodes - 1 - n_pillars)
+    counts = [0] * n_pillars
+    for _ in range(n_topics):
+        counts[rng.randrange(n_pillars)] += 1
+
+    pillars = []
+    for i, count in enumerate(counts, 1):
+        pillar = roadmap.Pillar(f"P{i}", f"Pillar {i}: solar storage and grid economics")
+        for j in range(1, count + 1):
+            pillar.topics.append(roadmap.Topic(
+                f"P{i}_T{j}", f"How to size a home battery for outage number {j}",
+                opportunity=rng.random() < 0.3
+            ))
+        pillars.append(pillar)
+    return roadmap.Roadmap("Solar Energy", "", pillars, "json")
+
+def min_distance(positions):
+    points = list(positions.values())
+    best = float("inf")
+    for i in range(len(points)):
+        x1, y1 = points[i]
+        for x2, y2 in points[i + 1:]:
+            best = min(best, math.hypot(x1 - x2, y1 - y2))
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark content-graph layouts.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200, 1000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'nodes':>6}  {'layout':<13} {'layout ms':>10} {'build ms':>9} {'payload KB':>11} {'min gap':>8}")
+    for size in args.sizes:
+        parsed = synthetic_roadmap(size)
+        for layout in ["Physics", "Radial", "Hierarchical"]:
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                positions = graph_layout.compute(parsed, layout)
+            layout_ms = (time.perf_counter() - started) * 1000 / args.repeat
+
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                nodes, edges = graph_layout.graph_elements(parsed, positions)
+            build_ms = (time.perf_counter() - started) * 1000 / args.repeat
+
+            payload = graph_layout.payload_bytes(nodes, edges, graph_layout.config_options(layout))
+            gap = f"{min_distance(positions):>8.0f}" if positions else f"{'browser':>8}"
+            print(f"{graph_layout.node_count(parsed):>6}  {layout:<13} {layout_ms:>10.2f} {build_ms:>9.2f} {payload / 1024:>11.1f} {gap}")
+        print(f"{'':>6}  auto -> {graph_layout.choose_layout(parsed)}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: streaming markdown rendering.
+
+Streams a long synthetic article (~2,000 words) chunk-by-chunk and compares
+the naive approach (re-render full_text + cursor on every chunk) against
+utils.StreamRenderer. Reports bytes sent to the frontend, number of render
+calls and time spent in render calls.
+
+Usage:
+    python bench_render.py                 # fake containers (payload bytes only)
+    streamlit run bench_render.py          # real Streamlit elements / websocket
+"""
+import time
+import random
+import argparse
+import streamlit as st
+import utils
+
+class FakeElement:
+    """Stands in for a Streamlit element outside `streamlit run`; counts payload bytes."""
+    def __init__(self, stats):
+        self.stats = stats
+
+    def markdown(self, text):
+        self.stats["bytes"] += len(text.encode("utf-8"))
+        self.stats["calls"] += 1
+
+    def container(self):
+        return FakeElement(self.stats)
+
+    def empty(self):
+        return FakeElement(self.stats)
+
+def synthetic_article(words=2000, seed=3):
+    rng = random.Random(seed)
+    vocab = "solar energy panel grid storage battery policy market price growth install efficient".split()
+    paragraphs = []
+    count = 0
+    while count < words:
+        if rng.random() < 0.15:
+            paragraphs.append(f"## Section {len(paragraphs)}")
+            continue
+        n = rng.randint(40, 90)
+        paragraphs.append(" ".join(rng.choice(vocab) for _ in range(n)).capitalize() + ".")
+        count += n
+    text = "\n\n".join(paragraphs)
+    # ~4 characters per streamed token
+    return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+def run_naive(chunks, element, stats, delay):
+    started = time.perf_counter()
+    full_text = ""
+    for chunk in chunks:
+        full_text += chunk
+        t = time.perf_counter()
+        element.markdown(full_text + "▌")
+        stats["render_time"] += time.perf_counter() - t
+        stats["bytes_counted"] += len((full_text + "▌").encode("utf-8"))
+        stats["calls_counted"] += 1
+        time.sleep(delay)
+    element.markdown(full_text)
+    return time.perf_counter() - started
+
+def run_renderer(chunks, element, stats, delay):
+    started = time.perf_counter()
+    renderer = utils.StreamRenderer(element)
+    for chunk in chunks:
+        renderer.write(chunk)
+        time.sleep(delay)
+    renderer.close()
+    stats["render_time"] += renderer.render_time
+    stats["bytes_counted"] += renderer.bytes_sent
+    stats["calls_counted"] += renderer.flushes
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming markdown rendering.")
+    parser.add_argument("--words", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=400, help="Simulated tokens per second")
+    args, _ = parser.parse_known_args()
+
+    chunks = synthetic_article(args.words)
+    delay = 1.0 / args.rate
+    live = st.runtime.exists()
+
+    print(f"Streaming {len(chunks)} chunks at {args.rate:.0f} tokens/s ({'streamlit' if live else 'fake elements'})\n")
+    for name, fn in [("naive full re-render", run_naive), ("StreamRenderer", run_renderer)]:
+        stats = {"bytes": 0, "calls": 0, "render_time": 0.0, "bytes_counted": 0, "calls_counted": 0}
+        element = st.empty() if live else FakeElement(stats)
+        wall = fn(chunks, element, stats, delay)
+        line = (f"{name:<22} {stats['bytes_counted'] / 1e6:>8.2f} MB sent  "
+                f"{stats['calls_counted']:>6} renders  {stats['render_time'] * 1000:>8.1f} ms in render  {wall:>6.2f} s wall")
+        print(line)
+        if live:
+            st.text(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import re
+import math
+from collections import Counter
+
+# Chunking & scoring defaults
+CHUNK_CHARS = 600           # Target passage size
+DUPLICATE_JACCARD = 0.8     # Passages this similar to an already-picked one are dropped
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOPWORDS = set("""
+a an and are as at be by for from has have how in is it its of on or that the this to was were what when
+where which who why will with you your can about into than then them they their there these those our
+""".split())
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+def tokenize(text):
+    return [w for w in _WORD_RE.findall(text.lower()) if len(w) > 2 and w not in STOPWORDS]
+
+def estimate_tokens(text):
+    """Rough token estimate (~4 characters per token for English)."""
+    return max(1, len(text) // 4)
+
+def chunk_text(text, chunk_chars=CHUNK_CHARS):
+    """Splits text into passages of roughly chunk_chars, on sentence boundaries."""
+    chunks = []
+    current = ""
+    for sentence in _SENTENCE_RE.split(" ".join(text.split())):
+        if current and len(current) + len(sentence) > chunk_chars:
+            chunks.append(current)
+            current = ""
+        # Hard-split runaway "sentences" (menus, tables without punctuation)
+        while len(sentence) > 2 * chunk_chars:
+            chunks.append(sentence[:chunk_chars])
+            sentence = sentence[chunk_chars:]
+        current = f"{current} {sentence}".strip()
+    if current:
+        chunks.append(current)
+    return chunks
+
+class _Chunk:
+    def __init__(self, doc_index, position, text):
+        self.doc_index = doc_index
+        self.position = position
+        self.text = text
+        self.terms = Counter(tokenize(text))
+        self.length = sum(self.terms.values())
+        self.score = 0.0
+
+def _bm25(chunks, query_terms):
+    n = len(chunks)
+    avg_len = sum(c.length for c in chunks) / n or 1.0
+    doc_freq = Counter()
+    for c in chunks:
+        doc_freq.update(c.terms.keys())
+    for c in chunks:
+        score = 0.0
+        for term in query_terms:
+            tf = c.terms.get(term)
+            if not tf:
+                continue
+            idf = math.log(1 + (n - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * c.length / avg_len))
+        c.score = score
+
+def _jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def pack(documents, query, max_tokens=750, token_counter=estimate_tokens):
+    """
+    Builds the most relevant context that fits a token budget.
+
+    Every document is chunked into passages, passages are scored against the
+    query with BM25, near-duplicates are dropped, and the best passages are
+    taken until the budget is full. Picked passages are emitted grouped by
+    document, in original order, under each document's label.
+
+    Args:
+        documents (list): (label, text) tuples, or plain strings.
+        query (str | list): Topic / search phrases the context should serve.
+        max_tokens (int): Budget for the returned context.
+        token_counter (callable): Counts tokens in a string.
+
+    Returns:
+        The packed context string.
+    """
+    if isinstance(query, (list, tuple)):
+        query = " ".join(query)
+    query_terms = set(tokenize(query))
+
+    labels = []
+    chunks = []
+    for doc_index, doc in enumerate(documents):
+        label, text = doc if isinstance(doc, tuple) else ("", doc)
+        labels.append(label)
+        for position, passage in enumerate(chunk_text(text or "")):
+            chunks.append(_Chunk(doc_index, position, passage))
+    if not chunks:
+        return ""
+
+    _bm25(chunks, query_terms)
+
+    # Best first; earlier passages win ties (leads usually summarise the page)
+    ranked = sorted(chunks, key=lambda c: (-c.score, c.position, c.doc_index))
+
+    picked = []
+    picked_terms = []
+    used = 0
+    for chunk in ranked:
+        cost = token_counter(chunk.text)
+        if used + cost > max_tokens:
+            continue
+        term_set = set(chunk.terms)
+        if any(_jaccard(term_set, other) >= DUPLICATE_JACCARD for other in picked_terms):
+            continue
+        picked.append(chunk)
+        picked_terms.append(term_set)
+        used += cost
+
+    sections = []
+    for doc_index, label in enumerate(labels):
+        passages = sorted((c for c in picked if c.doc_index == doc_index), key=lambda c: c.position)
+        if passages:
+            body = " ... ".join(c.text for c in passages)
+            sections.append(f"{label}\n{body}" if label else body)
+    return "\n\n".join(sections)
@@ -0,0 +1,99 @@
+import re
+import zlib
+import random
+
+# MinHash settings
+SHINGLE_WORDS = 5           # Word n-gram size for text shingles
+NUM_PERM = 64               # Signature length (estimate error ~ 1/sqrt(64) = 12%)
+TEXT_THRESHOLD = 0.6        # Estimated Jaccard at or above this = same article
+TITLE_THRESHOLD = 0.8       # Title token overlap at or above this = same story
+
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# "Headline - Reuters", "Headline | The Guardian": syndicated copies differ only in the publisher suffix
+_PUBLISHER_SUFFIX_RE = re.compile(r"\s+[-|–—]\s+[^-|–—]{1,40}$")
+
+def shingles(text, size=SHINGLE_WORDS):
+    """Hashed word n-grams of the text (stable across processes)."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)}
+
+def minhash(text):
+    """MinHash signature of the text's shingles, or None for empty text."""
+    hashed = shingles(text)
+    if not hashed:
+        return None
+    return [min((a * h + b) % _MERSENNE for h in hashed) for a, b in _PERMUTATIONS]
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / float(NUM_PERM)
+
+def title_terms(title):
+    """Words of the title without its publisher suffix. Short and numeric words are kept ("iPhone 15" vs "iPhone 16")."""
+    title = _PUBLISHER_SUFFIX_RE.sub("", (title or "").strip())
+    return set(_WORD_RE.findall(title.lower()))
+
+class Deduper:
+    """
+    Tracks the sources of one research run and flags near-duplicates.
+
+    seen_title() catches the same story under different URLs before it is
+    fetched; seen_text() catches syndicated copies after scraping (MinHash
+    over word shingles). Both remember what they were given when it is new.
+    Bytes and tokens of dropped texts are tallied for reporting.
+    """
+    def __init__(self, text_threshold=TEXT_THRESHOLD, title_threshold=TITLE_THRESHOLD, token_counter=None):
+        self.text_threshold = text_threshold
+        self.title_threshold = title_threshold
+        self.token_counter = token_counter or (lambda text: max(1, len(text) // 4))
+        self._titles = []       # (title, terms)
+        self._signatures = []   # (label, signature)
+        self.skipped_fetches = 0
+        self.dropped = []       # (label, duplicate of)
+        self.bytes_saved = 0
+        self.tokens_saved = 0
+
+    def seen_title(self, title):
+        """Returns the earlier title this one duplicates (and counts a skipped fetch), else records it and returns None."""
+        terms = title_terms(title)
+        if not terms:
+            return None
+        for other, other_terms in self._titles:
+            if len(terms & other_terms) / len(terms | other_terms) >= self.title_threshold:
+                self.skipped_fetches += 1
+                return other
+        self._titles.append((title, terms))
+        return None
+
+    def forget_title(self, title):
+        """Drops a recorded title whose fetch came back empty, so another copy of the story can stand in."""
+        self._titles = [(other, terms) for other, terms in self._titles if other != title]
+
+    def readmit(self, title):
+        """Records a previously skipped copy that is fetched after all (its original failed)."""
+        self.skipped_fetches = max(0, self.skipped_fetches - 1)
+        self._titles.append((title, title_terms(title)))
+
+    def seen_text(self, label, text):
+        """Returns the label of an earlier near-identical text (and tallies the savings), else records it and returns None."""
+        signature = minhash(text or "")
+        if signature is None:
+            return None
+        for other, other_signature in self._signatures:
+            if similarity(signature, other_signature) >= self.text_threshold:
+                self.dropped.append((label, other))
+                self.bytes_saved += len(text.encode("utf-8"))
+                self.tokens_saved += self.token_counter(text)
+                return other
+        self._signatures.append((label, signature))
+        return None
+
+    def summary(self):
+        return (f"{len(self.dropped)} near-duplicate sources dropped, {self.skipped_fetches} fetches skipped, "
+                f"{self.bytes_saved / 1024:.1f} KB / ~{self.tokens_saved:,} tokens saved")
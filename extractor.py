@@ -0,0 +1,260 @@
+import re
+import codecs
+from html.parser import HTMLParser
+
+# Tags whose content is never useful text (boilerplate or non-visible)
+SKIP_TAGS = {"script", "style", "nav", "footer", "header", "aside", "iframe", "noscript",
+             "form", "svg", "template", "button", "select"}
+
+# Tags that start/end a block of text
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "li", "ul", "ol", "table", "tr", "td", "th",
+              "blockquote", "pre", "dd", "dt", "figcaption", "br", "hr",
+              "h1", "h2", "h3", "h4", "h5", "h6"}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+# List items and table cells are short by nature (facts, figures); the length heuristic does not apply
+ITEM_TAGS = {"li", "td", "th", "dd", "dt"}
+MAIN_TAGS = {"article", "main"}
+
+# Boilerplate detection
+MIN_BLOCK_CHARS = 30        # Shorter blocks are kept only if they read like a sentence
+MAX_LINK_DENSITY = 0.5      # Blocks that are mostly link text are menus / related links
+MIN_MAIN_CHARS = 200        # <article>/<main> must hold at least this much text to be trusted
+
+FEED_CHUNK = 16 * 1024
+
+_CHARSET_RE = re.compile(rb'charset=["\']?([A-Za-z0-9_\-]+)', re.I)
+
+def _lxml_available():
+    try:
+        from lxml import etree  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+BACKENDS = ["lxml", "html.parser"] if _lxml_available() else ["html.parser"]
+DEFAULT_BACKEND = BACKENDS[0]
+
+class _Block:
+    def __init__(self, tag, in_main):
+        self.tag = tag
+        self.in_main = in_main
+        self.parts = []
+        self.link_chars = 0
+
+class _TextSink:
+    """
+    Receives start/end/data events (SAX style) and builds text blocks in a single pass.
+    Sets `done` once enough content has been collected so the caller can stop feeding.
+    """
+    def __init__(self, budget, mode):
+        self.budget = budget
+        self.mode = mode
+        self.blocks = []
+        self.kept_chars = 0
+        self.main_chars = 0
+        self.done = False
+        self._skip_depth = 0
+        self._link_depth = 0
+        self._main_depth = 0
+        self._block = _Block(None, False)
+
+    # --- Parser target interface (lxml) ---
+    def start(self, tag, attrib):
+        tag = tag.lower() if isinstance(tag, str) else ""
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+            return
+        if self._skip_depth:
+            return
+        if tag in MAIN_TAGS or (attrib and attrib.get("role") == "main"):
+            self._main_depth += 1
+        if tag == "a":
+            self._link_depth += 1
+        if tag in BLOCK_TAGS:
+            self._flush(tag)
+
+    def end(self, tag):
+        tag = tag.lower() if isinstance(tag, str) else ""
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+            return
+        if self._skip_depth:
+            return
+        if tag in BLOCK_TAGS:
+            self._flush(None)
+        if tag == "a":
+            self._link_depth = max(0, self._link_depth - 1)
+        if tag in MAIN_TAGS:
+            self._main_depth = max(0, self._main_depth - 1)
+
+    def data(self, text):
+        if self._skip_depth or self.done:
+            return
+        self._block.parts.append(text)
+        if self._link_depth:
+            self._block.link_chars += len(text.strip())
+
+    def close(self):
+        self._flush(None)
+        return None
+
+    # --- Block handling ---
+    def _flush(self, next_tag):
+        block = self._block
+        self._block = _Block(next_tag, self._main_depth > 0)
+
+        text = " ".join("".join(block.parts).split())
+        if not text:
+            return
+        if not self._is_content(block, text):
+            return
+
+        if self.mode == "markdown":
+            if block.tag in HEADING_TAGS:
+                text = f"{'#' * int(block.tag[1])} {text}"
+            elif block.tag == "li":
+                text = f"- {text}"
+
+        self.blocks.append((text, block.in_main))
+        self.kept_chars += len(text) + 1
+        if block.in_main:
+            self.main_chars += len(text) + 1
+        # Stop once main content fills the budget, or the page as a whole clearly does
+        if self.main_chars >= self.budget or self.kept_chars >= 3 * self.budget:
+            self.done = True
+
+    def _is_content(self, block, text):
+        if block.tag in HEADING_TAGS:
+            return True
+        if block.link_chars / len(text) > MAX_LINK_DENSITY:
+            return False
+        if block.tag in ITEM_TAGS:
+            return True
+        return len(text) >= MIN_BLOCK_CHARS or text.endswith((".", "!", "?", ":"))
+
+    def result(self):
+        """Returns (text, truncated)."""
+        blocks = self.blocks
+        if self.main_chars >= MIN_MAIN_CHARS:
+            blocks = [b for b in blocks if b[1]]
+        separator = "\n" if self.mode == "markdown" else " "
+        text = separator.join(b[0] for b in blocks)
+        if len(text) > self.budget:
+            return text[:self.budget], True
+        return text, self.done
+
+class _StdlibParser(HTMLParser):
+    """Adapts html.parser callbacks to the sink interface."""
+    def __init__(self, sink):
+        super().__init__(convert_charrefs=True)
+        self.sink = sink
+
+    def handle_starttag(self, tag, attrs):
+        self.sink.start(tag, dict(attrs))
+
+    def handle_endtag(self, tag):
+        self.sink.end(tag)
+
+    def handle_data(self, data):
+        self.sink.data(data)
+
+class StreamingExtractor:
+    """
+    Incremental HTML-to-text extractor.
+
+    Feed raw bytes as they arrive; feed() returns True once the character
+    budget is filled, at which point the caller can stop downloading.
+
+    Args:
+        budget (int): Maximum characters of text to return.
+        mode (str): "text" (plain, space-joined) or "markdown" (keeps headings and list items).
+        backend (str): "lxml" or "html.parser". Defaults to lxml when installed.
+        encoding (str): Body encoding; sniffed from the first chunk if not given.
+        suffix (str): Appended by finish() when the text was cut at the budget (e.g. "...").
+    """
+    def __init__(self, budget=3000, mode="text", backend=None, encoding=None, suffix=""):
+        self.sink = _TextSink(budget, mode)
+        self.suffix = suffix
+        self.backend = backend or DEFAULT_BACKEND
+        self.encoding = encoding
+        self._decoder = None
+        self._parser = None
+        self._closed = False
+
+    def _start(self, first_chunk):
+        encoding = self.encoding
+        if not encoding:
+            match = _CHARSET_RE.search(first_chunk[:4096])
+            encoding = match.group(1).decode("ascii") if match else "utf-8"
+        try:
+            self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        except LookupError:
+            self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+        if self.backend == "lxml":
+            from lxml import etree
+            self._parser = etree.HTMLParser(target=self.sink)
+        else:
+            self._parser = _StdlibParser(self.sink)
+
+    def feed(self, chunk):
+        if self.sink.done or self._closed:
+            return True
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+            if self._parser is None:
+                self.encoding = "utf-8"
+        if self._parser is None:
+            self._start(chunk)
+        text = self._decoder.decode(chunk)
+        if text:
+            self._parser.feed(text)
+        return self.sink.done
+
+    @property
+    def truncated(self):
+        return self.result()[1]
+
+    def close(self):
+        """Finishes parsing and returns the extracted text."""
+        if not self._closed and self._parser is not None:
+            self._closed = True
+            try:
+                if not self.sink.done:
+                    tail = self._decoder.decode(b"", final=True)
+                    if tail:
+                        self._parser.feed(tail)
+                self._parser.close()
+            except Exception:
+                # Partial documents (early stop / truncated bodies) may not close cleanly
+                pass
+            self.sink.close()
+        return self.result()[0]
+
+    def result(self):
+        return self.sink.result()
+
+    def finish(self):
+        """close(), plus the suffix when the text was cut at the budget."""
+        text = self.close()
+        return text + self.suffix if self.truncated and text else text
+
+def extract(html, budget=3000, mode="text", backend=None, suffix=""):
+    """
+    Extracts the main text of an HTML document in a single streaming pass,
+    stopping as soon as the budget is filled.
+
+    Args:
+        html (bytes | str): The document.
+        suffix (str): Appended when the text was cut at the budget (e.g. "...").
+    """
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+        extractor = StreamingExtractor(budget, mode, backend, encoding="utf-8", suffix=suffix)
+    else:
+        extractor = StreamingExtractor(budget, mode, backend, suffix=suffix)
+
+    for i in range(0, len(html), FEED_CHUNK):
+        if extractor.feed(html[i:i + FEED_CHUNK]):
+            break
+    return extractor.finish()
@@ -0,0 +1,256 @@
+import time
+import random
+import threading
+import collections
+import concurrent.futures
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import page_cache
+
+# Politeness & concurrency defaults
+HOST_DELAY_RANGE = (0.5, 1.5)   # Seconds between two requests to the same host
+MAX_WORKERS = 6                 # Global cap on simultaneous fetches
+PHASE_DEADLINE = 25             # Seconds before slow sources are dropped
+
+# Session / transfer defaults
+MAX_RESPONSE_BYTES = 2 * 1024 * 1024   # Hard cap on bytes read per response
+POOL_SIZE = 10                         # Keep-alive connections per host
+RETRY_TOTAL = 2
+RETRY_BACKOFF = 0.5                    # 0.5s, 1s, ... between retries
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRY_AFTER = 10.0                 # Longest sleep honoured from a Retry-After header
+MAX_SESSIONS = 64                      # Pooled host sessions kept (least recently used are dropped)
+
+# Content types the scrapers can extract text from; anything else (PDFs, images, archives) is rejected from headers alone
+HTML_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+class ContentTypeError(ValueError):
+    """Raised when a response's Content-Type is not one the caller accepts."""
+
+_host_next_slot = {}
+_host_lock = threading.Lock()
+
+_sessions = collections.OrderedDict()   # host -> Session, in least-recently-used order
+_sessions_lock = threading.Lock()
+
+def _accept_encoding():
+    """Advertise brotli only when urllib3 can actually decode it."""
+    try:
+        import brotli  # noqa: F401
+        return "gzip, deflate, br"
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            return "gzip, deflate, br"
+        except ImportError:
+            return "gzip, deflate"
+
+ACCEPT_ENCODING = _accept_encoding()
+
+class _CappedRetry(Retry):
+    """Honours Retry-After, but never sleeps longer than MAX_RETRY_AFTER on it."""
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return min(retry_after, MAX_RETRY_AFTER) if retry_after is not None else None
+
+def _build_session():
+    retry = _CappedRetry(
+        total=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    return session
+
+def get_session(url):
+    """
+    Returns the pooled Session for the URL's host (shared across threads and reruns).
+    At most MAX_SESSIONS hosts are kept; the least recently used one is dropped
+    (not closed: a thread may still be using it, and it is freed once released).
+    """
+    host = urlparse(url).netloc.lower()
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = _build_session()
+            _sessions[host] = session
+            if len(_sessions) > MAX_SESSIONS:
+                _sessions.popitem(last=False)
+        else:
+            _sessions.move_to_end(host)
+    return session
+
+def _content_type_allowed(headers, allowed_types):
+    content_type = headers.get("Content-Type", "").split(";")[0].strip().lower()
+    return not content_type or content_type in allowed_types
+
+def get(url, headers=None, timeout=15, max_bytes=MAX_RESPONSE_BYTES, allowed_types=None, on_chunk=None, **kwargs):
+    """
+    GET through the pooled per-host session, with retries on 429/5xx.
+    At most `max_bytes` of the (decompressed) body are read; the rest is
+    discarded so a huge page can't blow up memory. The returned Response
+    behaves as usual (.content, .text, .json(), .raise_for_status()).
+
+    Args:
+        allowed_types (tuple): Accepted Content-Types; a 200 with any other type raises
+            ContentTypeError before the body is read. None accepts everything.
+        on_chunk (callable): Receives each body chunk of a successful response as it
+            arrives; returning True stops the download early.
+
+    response.complete is False when the body was cut short (byte cap or on_chunk).
+    """
+    response = get_session(url).get(url, headers=headers, timeout=timeout, stream=True, **kwargs)
+    try:
+        if allowed_types and response.status_code == 200 and not _content_type_allowed(response.headers, allowed_types):
+            raise ContentTypeError(f"unsupported content type '{response.headers.get('Content-Type')}' for {url}")
+        
+        body = bytearray()
+        response.complete = True
+        for chunk in response.iter_content(chunk_size=16 * 1024):
+            truncated = len(body) + len(chunk) >= max_bytes
+            if truncated:
+                chunk = chunk[:max_bytes - len(body)]
+            body.extend(chunk)
+            if truncated:
+                print(f"  ✂️ Truncated {url} at {max_bytes} bytes")
+                response.complete = False
+                # The kept part of the chunk still reaches the caller
+                if on_chunk and response.ok and chunk:
+                    on_chunk(chunk)
+                break
+            if on_chunk and response.ok and on_chunk(chunk):
+                # The caller has all it needs; skip the rest of the body
+                response.complete = False
+                break
+        response._content = bytes(body)
+        response._content_consumed = True
+    finally:
+        response.close()
+    return response
+
+def fetch_extract(url, kind, extract_fn, headers=None, timeout=15, polite=True, stream_fn=None, allowed_types=HTML_TYPES):
+    """
+    Fetches a page through the persistent page cache and returns extract_fn(body).
+
+    - Fresh cached page with a cached extract: no network, no parsing.
+    - Fresh cached page: re-extracts from the stored body.
+    - Stale cached page: conditional GET (If-None-Match / If-Modified-Since);
+      a 304 reuses the stored body and extract.
+    - Otherwise: normal GET, stored according to Cache-Control. Non-HTML
+      responses are rejected from their headers (ContentTypeError).
+
+    Args:
+        kind (str): Name of the extraction (e.g. "text", "markdown"); extracts are cached per kind.
+        extract_fn (callable): Turns raw body bytes into the returned value (a string).
+        polite (bool): Apply the per-host delay before hitting the network.
+        stream_fn (callable): Optional factory for an incremental extractor (feed(bytes) -> done,
+            finish() -> text). Downloads are then parsed as they arrive and stop once it is done.
+        allowed_types (tuple): Accepted Content-Types (see get()).
+    """
+    cache = page_cache.get_cache()
+    cached = cache.lookup(url) if cache else None
+    if cached and not cached.complete and cache.get_extract(url, kind) is None:
+        # Body was cut short for another extraction; it can't serve this one
+        cached = None
+
+    if cached and cached.is_fresh():
+        cache.hits += 1
+        text = cache.get_extract(url, kind)
+        if text is not None:
+            cache.extract_hits += 1
+            return text
+        text = extract_fn(cached.body)
+        cache.put_extract(url, kind, text)
+        return text
+
+    request_headers = dict(headers or {})
+    if cached:
+        request_headers.update(cached.conditional_headers())
+
+    if polite:
+        wait_for_host(url)
+    streamer = stream_fn() if stream_fn else None
+    response = get(
+        url, headers=request_headers, timeout=timeout, allowed_types=allowed_types,
+        on_chunk=streamer.feed if streamer else None
+    )
+
+    if cached and response.status_code == 304:
+        cache.revalidated += 1
+        cache.refresh(url, response.headers)
+        text = cache.get_extract(url, kind)
+        if text is None:
+            text = extract_fn(cached.body)
+            cache.put_extract(url, kind, text)
+        return text
+
+    response.raise_for_status()
+    text = streamer.finish() if streamer else extract_fn(response.content)
+    if cache:
+        cache.misses += 1
+        cache.store(url, response.content, response.headers, complete=response.complete)
+        cache.put_extract(url, kind, text)
+    return text
+
+def wait_for_host(url):
+    """
+    Per-host politeness delay.
+    Requests to the same host are spaced by a random delay, while requests
+    to different hosts proceed immediately (no global sleep).
+    """
+    host = urlparse(url).netloc.lower()
+    delay = random.uniform(*HOST_DELAY_RANGE)
+    with _host_lock:
+        now = time.time()
+        slot = max(now, _host_next_slot.get(host, 0))
+        _host_next_slot[host] = slot + delay
+    wait = slot - now
+    if wait > 0:
+        time.sleep(wait)
+
+def fetch_all(urls, fetch_fn, max_workers=MAX_WORKERS, deadline=PHASE_DEADLINE, on_result=None):
+    """
+    Runs fetch_fn(url) for every URL concurrently.
+
+    Args:
+        urls (list): URLs to fetch.
+        fetch_fn (callable): Function taking a URL and returning its content.
+        max_workers (int): Global concurrency cap.
+        deadline (float): Seconds after which unfinished fetches are dropped.
+        on_result (callable): Optional callback(index, url, result) fired as each fetch completes.
+
+    Returns:
+        List of results in the same order as `urls` (None for failed or dropped sources).
+    """
+    results = [None] * len(urls)
+    if not urls:
+        return results
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls))))
+    futures = {executor.submit(fetch_fn, url): i for i, url in enumerate(urls)}
+    try:
+        for future in concurrent.futures.as_completed(futures, timeout=deadline):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                print(f"  ⚠️ Fetch failed for {urls[i]}: {e}")
+            if on_result:
+                on_result(i, urls[i], results[i])
+    except concurrent.futures.TimeoutError:
+        dropped = [urls[i] for f, i in futures.items() if not f.done()]
+        print(f"  ⏱️ Deadline reached, dropping {len(dropped)} slow source(s): {dropped}")
+    finally:
+        # Don't block on stragglers; their results are discarded
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
@@ -0,0 +1,104 @@
+import os
+import re
+import time
+import threading
+import streamlit as st
+import fetcher
+
+# Geo service (point at a local stand-in for testing, e.g. http://127.0.0.1:8765)
+GEO_SERVICE = os.getenv("STRATOS_GEO_SERVICE", "https://ipapi.co").rstrip("/")
+GEO_TIMEOUT = float(os.getenv("STRATOS_GEO_TIMEOUT", "3"))
+GEO_CACHE_TTL = 24 * 3600
+DEFAULT_COUNTRY = "US"
+
+# Process-wide IP -> country cache, shared by all sessions
+_ip_cache = {}
+_ip_cache_lock = threading.Lock()
+
+_LANG_REGION_RE = re.compile(r"^[a-zA-Z]{2,3}[-_]([a-zA-Z]{2})$")
+
+def country_from_accept_language(header):
+    """
+    Offline resolver: the first language tag with a region ('en-NG' -> 'NG').
+    Returns None when no tag carries a region.
+    """
+    for part in (header or "").split(","):
+        tag = part.split(";")[0].strip()
+        match = _LANG_REGION_RE.match(tag)
+        if match:
+            return match.group(1).upper()
+    return None
+
+def lookup_country(ip, timeout=GEO_TIMEOUT):
+    """
+    Asks the geo service for the country of the visitor's `ip`.
+    Results are cached per IP for a day. Returns None on any failure, and
+    without a request when there is no IP: asking the service about "the
+    caller" would return the server's own country.
+    """
+    if not ip:
+        return None
+    now = time.time()
+    with _ip_cache_lock:
+        cached = _ip_cache.get(ip)
+        if cached and now - cached[1] < GEO_CACHE_TTL:
+            return cached[0]
+
+    try:
+        response = fetcher.get(f"{GEO_SERVICE}/{ip}/json/", timeout=timeout)
+        if response.status_code != 200:
+            return None
+        country = response.json().get('country_code')
+    except Exception:
+        return None
+
+    if country:
+        with _ip_cache_lock:
+            _ip_cache[ip] = (country, now)
+    return country
+
+def _request_headers():
+    try:
+        return dict(st.context.headers)
+    except Exception:
+        return {}
+
+def client_ip(headers):
+    """The visitor's IP (not the server's), when the deployment exposes it."""
+    try:
+        ip = st.context.ip_address
+        if ip:
+            return ip
+    except Exception:
+        pass
+    forwarded = headers.get("X-Forwarded-For") or headers.get("x-forwarded-for") or ""
+    return forwarded.split(",")[0].strip() or None
+
+def _resolve(state, ip, fallback):
+    state["country"] = lookup_country(ip) or fallback
+
+def get_user_country(default=DEFAULT_COUNTRY):
+    """
+    Returns the visitor's country code without ever blocking the script.
+
+    The geo service is queried at most once per session, on a background
+    thread, and only when the visitor's IP is known. Until it answers (or if
+    it fails, or there is no IP) the Accept-Language header is used, then `default`.
+    """
+    state = st.session_state.setdefault('_geo', {"country": None, "started": False})
+    if state["country"]:
+        return state["country"]
+
+    headers = _request_headers()
+    fallback = country_from_accept_language(headers.get("Accept-Language") or headers.get("accept-language")) or default
+
+    if not state["started"]:
+        state["started"] = True
+        ip = client_ip(headers)
+        if not ip:
+            # Nothing to look up (e.g. behind a proxy that hides the client); settle on the fallback
+            state["country"] = fallback
+            return fallback
+        threading.Thread(target=_resolve, args=(state, ip, fallback), daemon=True).start()
+
+    return fallback
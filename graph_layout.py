@@ -0,0 +1,164 @@
+import math
+import json
+
+# Graphs up to this many nodes settle quickly enough in the browser to keep physics
+PHYSICS_MAX_NODES = 30
+
+LAYOUTS = ["Auto", "Radial", "Hierarchical", "Physics"]
+
+# Radial layout geometry (vis.js canvas units)
+MIN_GAP = 110          # Minimum arc distance between neighbouring topic nodes
+PILLAR_RADIUS = 320    # Smallest ring for pillars
+TOPIC_OFFSET = 260     # First topic ring sits this far outside the pillar ring
+RING_STEP = 120        # Extra rings when a pillar's sector is too narrow for its topics
+
+# Hierarchical layout geometry
+LEVEL_GAP = 260
+COLUMN_GAP = 190
+ROW_GAP = 80
+
+def truncate(text, limit=25):
+    return text[:limit] + "..." if len(text) > limit else text
+
+def node_count(parsed):
+    return 1 + len(parsed.pillars) + parsed.topic_count
+
+def choose_layout(parsed, requested="Auto"):
+    """Resolves "Auto": physics for small graphs, a precomputed radial layout for large ones."""
+    if requested != "Auto":
+        return requested
+    return "Physics" if node_count(parsed) <= PHYSICS_MAX_NODES else "Radial"
+
+def radial(parsed):
+    """
+    Root in the centre, pillars on a ring, each pillar's topics fanned out in
+    its own angular sector (sized by topic count). Topics that do not fit on
+    one arc spill onto further rings. Returns {node_id: (x, y)}.
+    """
+    positions = {"ROOT": (0.0, 0.0)}
+    pillars = parsed.pillars
+    if not pillars:
+        return positions
+
+    pillar_radius = max(PILLAR_RADIUS, len(pillars) * MIN_GAP * 1.5 / (2 * math.pi))
+    weights = [max(1, len(p.topics)) for p in pillars]
+    total = float(sum(weights))
+
+    angle = -math.pi / 2
+    for pillar, weight in zip(pillars, weights):
+        sector = 2 * math.pi * weight / total
+        middle = angle + sector / 2
+        positions[pillar.id] = (pillar_radius * math.cos(middle), pillar_radius * math.sin(middle))
+
+        # Keep a margin between neighbouring sectors
+        usable = sector * 0.85
+        start = middle - usable / 2
+        remaining = list(pillar.topics)
+        radius = pillar_radius + TOPIC_OFFSET
+        while remaining:
+            capacity = max(1, int(usable * radius / MIN_GAP))
+            ring, remaining = remaining[:capacity], remaining[capacity:]
+            for i, topic in enumerate(ring):
+                theta = start + usable * (i + 0.5) / len(ring)
+                positions[topic.id] = (radius * math.cos(theta), radius * math.sin(theta))
+            radius += RING_STEP
+        angle += sector
+    return positions
+
+def hierarchical(parsed):
+    """
+    Top-down tree: root, a row of pillars, and each pillar's topics in a
+    compact grid of columns beneath it. Returns {node_id: (x, y)}.
+    """
+    positions = {"ROOT": (0.0, 0.0)}
+    blocks = []
+    for pillar in parsed.pillars:
+        columns = max(1, math.ceil(math.sqrt(len(pillar.topics) / 2.0)))
+        blocks.append((pillar, columns))
+
+    total_width = sum(columns * COLUMN_GAP for _, columns in blocks) + COLUMN_GAP * max(0, len(blocks) - 1)
+    x = -total_width / 2.0
+    for pillar, columns in blocks:
+        width = columns * COLUMN_GAP
+        centre = x + width / 2.0
+        positions[pillar.id] = (centre, float(LEVEL_GAP))
+        for i, topic in enumerate(pillar.topics):
+            column, row = i % columns, i // columns
+            positions[topic.id] = (x + (column + 0.5) * COLUMN_GAP, 2.0 * LEVEL_GAP + row * ROW_GAP)
+        x += width + COLUMN_GAP
+    return positions
+
+def compute(parsed, layout):
+    """Returns positions for a static layout, or None for "Physics"."""
+    if layout == "Radial":
+        return radial(parsed)
+    if layout == "Hierarchical":
+        return hierarchical(parsed)
+    return None
+
+def graph_elements(parsed, positions=None):
+    """
+    Builds the graph as plain dicts (agraph Node / Edge keyword arguments).
+    With positions, every node is pinned at its precomputed (x, y).
+    """
+    def place(node):
+        if positions and node["id"] in positions:
+            x, y = positions[node["id"]]
+            node["x"], node["y"] = round(x, 1), round(y, 1)
+        return node
+
+    nodes = []
+    edges = []
+
+    # Central Node (The Niche)
+    nodes.append(place({"id": "ROOT", "label": parsed.niche, "size": 50, "color": "#FFD700", "font": {'size': 24, 'color': 'black', 'face': 'arial'}})) # Gold, Big Hub
+
+    for pillar in parsed.pillars:
+        # Pillar Node (Medium Hub)
+        nodes.append(place({"id": pillar.id, "label": truncate(pillar.name), "title": pillar.name, "size": 35, "color": "#1E90FF", "font": {'size': 18, 'color': 'white', 'face': 'arial'}}))
+        edges.append({"source": "ROOT", "target": pillar.id, "width": 3, "color": "#A9A9A9"}) # Thicker edge
+
+        for topic in pillar.topics:
+            # Opportunity = Gold/Orange (High Demand), Standard = Green (Safe/Standard)
+            if topic.opportunity:
+                color, label, size = "#FF8C00", f"🔥 {truncate(topic.title)}", 25
+            else:
+                color, label, size = "#00C851", truncate(topic.title), 20
+
+            # Topic Node (Leaf)
+            nodes.append(place({"id": topic.id, "label": label, "title": topic.title, "size": size, "color": color, "font": {'size': 14, 'color': 'white', 'face': 'arial'}}))
+            edges.append({"source": pillar.id, "target": topic.id, "width": 1, "color": "#D3D3D3"})
+
+    return nodes, edges
+
+def config_options(layout):
+    """agraph Config keyword arguments for a layout."""
+    options = {
+        "width": None,
+        "height": 800,
+        "directed": True,
+        "hierarchical": False,
+        "node": {'labelProperty': 'label', 'renderLabel': True},
+        "edges": {'smooth': False},
+    }
+    if layout == "Physics":
+        options["physics"] = True
+        options["physicsOptions"] = {
+            "barnesHut": {
+                "gravitationalConstant": -10000,
+                "centralGravity": 0.1,
+                "springLength": 250,
+                "springConstant": 0.01,
+                "damping": 0.09,
+                "avoidOverlap": 1
+            },
+            "minVelocity": 0.75
+        }
+    else:
+        # Positions are precomputed; the browser only draws
+        options["physics"] = False
+    return options
+
+def payload_bytes(nodes, edges, options):
+    """Approximate size of the JSON sent to the graph component."""
+    return len(json.dumps({"nodes": nodes, "edges": edges, "config": options}, default=str).encode("utf-8"))
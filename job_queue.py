@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+import concurrent.futures
+
+# Job settings (overridable via environment)
+CACHE_DIR = os.getenv("STRATOS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".stratos_cache"))
+MAX_WORKERS = int(os.getenv("STRATOS_JOB_WORKERS", "4"))
+JOB_RETENTION = float(os.getenv("STRATOS_JOB_RETENTION", str(24 * 3600)))   # Finished jobs are kept this long
+
+ACTIVE = ("queued", "running")
+
+# Arguments that do not change a job's result, so they are left out of its dedup key
+_KEY_EXCLUDE = {"progress"}
+
+class Job:
+    """
+    Handle passed to a running job (as the `job` keyword argument).
+    report() records a progress message; write() appends streamed output
+    that pollers can show while the job is still running.
+    """
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.id = job_id
+        self.messages = []
+        self.partial = []
+
+    def report(self, message):
+        self.messages.append(str(message).strip())
+        self.queue._update(self.id, messages=json.dumps(self.messages, ensure_ascii=False))
+
+    def write(self, text):
+        self.partial.append(text)
+
+class JobQueue:
+    """
+    Runs long jobs (roadmaps, research, synthesis) on a worker pool, outside
+    the Streamlit script thread, and records them in a SQLite job table.
+
+    - submit() returns a job ID immediately; pages poll get() across reruns.
+    - Submitting a job identical to one still queued/running (same kind,
+      arguments and API key) returns the existing job's ID, so duplicate
+      submits share one run. The key is part of the dedup key (hashed), so
+      one user's job is never billed to, or shown to, another user.
+    - Results are stored as JSON, so they must be JSON-serialisable
+      (tuples come back as lists).
+    - Jobs left running by a previous process are marked failed on startup.
+    """
+    def __init__(self, path, max_workers=MAX_WORKERS):
+        self.path = path
+        self._lock = threading.Lock()
+        self._active = {}    # dedup key -> job ID (queued / running in this process)
+        self._handles = {}   # job ID -> Job (for streamed partial output)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stratos-job")
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    dedup_key TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    messages TEXT NOT NULL DEFAULT '[]',
+                    result TEXT,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    started REAL,
+                    finished REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs(dedup_key, status)")
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'interrupted (server restarted)', finished = ? WHERE status IN (?, ?)",
+                (time.time(),) + ACTIVE
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _update(self, job_id, **fields):
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", tuple(fields.values()) + (job_id,))
+
+    @staticmethod
+    def make_key(kind, args, kwargs):
+        kwargs = {k: v for k, v in kwargs.items() if k not in _KEY_EXCLUDE}
+        if kwargs.get("api_key"):
+            kwargs["api_key"] = hashlib.sha256(str(kwargs["api_key"]).encode("utf-8")).hexdigest()
+        payload = json.dumps([kind, list(args), kwargs], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def submit(self, kind, fn, args=(), kwargs=None, with_job=False):
+        """
+        Queues fn(*args, **kwargs) and returns its job ID.
+
+        Args:
+            kind (str): Job type, e.g. "roadmap" (part of the dedup key).
+            fn (callable): The work to run on the pool.
+            with_job (bool): Pass a Job handle as the `job` keyword argument.
+        """
+        kwargs = dict(kwargs or {})
+        key = self.make_key(kind, args, kwargs)
+        with self._lock:
+            existing = self._active.get(key)
+            if existing:
+                return existing
+            job_id = uuid.uuid4().hex
+            self._active[key] = job_id
+            handle = Job(self, job_id)
+            self._handles[job_id] = handle
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, dedup_key, status, created) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, kind, key, now)
+            )
+            conn.execute("DELETE FROM jobs WHERE finished IS NOT NULL AND finished < ?", (now - JOB_RETENTION,))
+
+        if with_job:
+            kwargs["job"] = handle
+        self._executor.submit(self._run, job_id, key, fn, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, key, fn, args, kwargs):
+        self._update(job_id, status="running", started=time.time())
+        try:
+            result = fn(*args, **kwargs)
+            self._update(job_id, status="done", result=json.dumps(result, ensure_ascii=False, default=str), finished=time.time())
+        except Exception as e:
+            print(f"  ❌ Job {job_id[:8]} failed: {e}")
+            self._update(job_id, status="failed", error=str(e), finished=time.time())
+        finally:
+            with self._lock:
+                self._active.pop(key, None)
+                self._handles.pop(job_id, None)
+
+    def get(self, job_id):
+        """
+        Returns the job as a dict (id, kind, status, messages, partial, result,
+        error, elapsed), or None if unknown. status is queued / running / done / failed.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, kind, status, messages, result, error, created, started, finished FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, kind, status, messages, result, error, created, started, finished = row
+        handle = self._handles.get(job_id)
+        return {
+            "id": job_id,
+            "kind": kind,
+            "status": status,
+            "messages": json.loads(messages),
+            "partial": "".join(handle.partial) if handle else "",
+            "result": json.loads(result) if result is not None else None,
+            "error": error,
+            "elapsed": (finished or time.time()) - (started or created),
+        }
+
+    def stats(self):
+        """Counts jobs by status."""
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_queue():
+    """Returns the process-wide job queue (shared by every session)."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue(os.path.join(CACHE_DIR, "jobs.sqlite"))
+    return _queue
@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Cache settings (overridable via environment)
+CACHE_ENABLED = os.getenv("STRATOS_LLM_CACHE", "1") != "0"
+CACHE_DIR = os.getenv("STRATOS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".stratos_cache"))
+CACHE_TTL = float(os.getenv("STRATOS_LLM_CACHE_TTL", str(24 * 3600)))
+CACHE_MAX_BYTES = int(os.getenv("STRATOS_LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+class ResponseCache:
+    """
+    Content-addressed store for LLM responses, backed by SQLite.
+
+    Each entry holds the response as a list of text chunks, so a cached
+    answer can be replayed chunk-by-chunk to streaming callers.
+    Entries expire after `ttl` seconds; when the store grows beyond
+    `max_bytes` the least recently used entries are evicted.
+    """
+    def __init__(self, path, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    chunks TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    @staticmethod
+    def make_key(model, system_instruction, prompt, temperature):
+        """Hashes everything that determines the response into a stable key."""
+        payload = json.dumps([model, system_instruction or "", prompt, float(temperature)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Returns the cached list of chunks, or None on a miss / expired entry."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT chunks, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key, chunks):
+        """Stores a response (list of text chunks) and evicts if over budget."""
+        data = json.dumps(chunks, ensure_ascii=False)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, chunks, size, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data.encode("utf-8")), now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall():
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    def stats(self):
+        """Returns hit/miss counters for this process plus current store size."""
+        with self._lock, self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Returns the process-wide response cache, or None if caching is disabled."""
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(os.path.join(CACHE_DIR, "llm_cache.sqlite"))
+    return _cache
+
+def should_cache(cache, temperature):
+    """
+    Decides whether a call is cacheable.
+    cache=None (default) caches only deterministic calls (temperature 0);
+    True/False force the decision either way.
+    """
+    if cache is None:
+        return temperature == 0
+    return bool(cache)
@@ -1,18 +1,50 @@
 import os
-from openai import OpenAI
+import re
+import time
+import asyncio
+import collections
+import queue
+import concurrent.futures
+import threading
+import weakref
+import httpx
+from openai import OpenAI, AsyncOpenAI
 import streamlit as st
 from dotenv import load_dotenv
+import llm_cache
 
 # Load environment variables
 load_dotenv()
 
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+# Connection pool settings (overridable via environment)
+POOL_MAX_CONNECTIONS = int(os.getenv("STRATOS_LLM_MAX_CONNECTIONS", "20"))
+POOL_MAX_KEEPALIVE = int(os.getenv("STRATOS_LLM_MAX_KEEPALIVE", "10"))
+POOL_KEEPALIVE_EXPIRY = float(os.getenv("STRATOS_LLM_KEEPALIVE_EXPIRY", "60"))
+CONNECT_TIMEOUT = float(os.getenv("STRATOS_LLM_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.getenv("STRATOS_LLM_READ_TIMEOUT", "120"))
+
+# Process-wide client registry, keyed by (base_url, api_key).
+# Module state survives Streamlit reruns and is shared by all sessions,
+# so every LLM call reuses warm keep-alive connections.
+_clients = {}
+_clients_lock = threading.Lock()
+
 class GeminiAdapter:
     """
     Adapts OpenAI response to look like Gemini response.
-    Has a .text property.
+    Has a .text property (None if the request failed inside a batch, see .error).
+    Also carries the measured .input_tokens / .output_tokens, .latency (seconds)
+    and .model, when known, for cost and latency tracking.
     """
-    def __init__(self, content):
+    def __init__(self, content, error=None):
         self.text = content
+        self.error = error
+        self.model = None
+        self.input_tokens = None
+        self.output_tokens = None
+        self.latency = None
 
 class GeminiStreamAdapter:
     """
@@ -21,6 +53,33 @@ class GeminiStreamAdapter:
     def __init__(self, content):
         self.text = content
 
+class GeminiStream:
+    """
+    Iterator of GeminiStreamAdapter chunks returned by generate(stream=True).
+    .usage holds the API's usage block once the stream has been read to the
+    end (None if the provider sent none, or the stream was closed early).
+    """
+    def __init__(self):
+        self.usage = None
+        self._chunks = iter(())
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._chunks)
+
+    def close(self):
+        self._chunks.close()
+
+def _cached_response(chunks, stream):
+    """Rebuilds a generate() return value from cached chunks."""
+    if stream:
+        return (GeminiStreamAdapter(c) for c in chunks)
+    response = GeminiAdapter("".join(chunks))
+    response.cached = True
+    return response
+
 def get_api_key():
     """
     Retrieves API key from Streamlit secrets or environment variables.
@@ -43,7 +102,244 @@ def get_api_key():
         
     return None
 
-def generate(prompt, system_instruction=None, model=None, stream=False, temperature=0.7, api_key=None):
+def _http2_available():
+    """HTTP/2 needs the optional 'h2' package; fall back to HTTP/1.1 keep-alive without it."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _build_http_client(asynchronous=False):
+    limits = httpx.Limits(
+        max_connections=POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=POOL_MAX_KEEPALIVE,
+        keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+    client_cls = httpx.AsyncClient if asynchronous else httpx.Client
+    return client_cls(http2=_http2_available(), limits=limits, timeout=timeout)
+
+def get_client(api_key, base_url=OPENROUTER_BASE_URL):
+    """
+    Returns a pooled OpenAI client for (base_url, api_key), creating it on first use.
+    The underlying httpx client keeps connections alive between calls,
+    so repeated generate() calls skip the TCP/TLS handshake.
+    """
+    key = (base_url, api_key)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = OpenAI(
+                base_url=base_url,
+                api_key=api_key,
+                http_client=_build_http_client(),
+            )
+            _clients[key] = client
+    return client
+
+def close_clients():
+    """Closes all pooled clients (e.g. on shutdown or after rotating API keys)."""
+    with _clients_lock:
+        for client in _clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _clients.clear()
+
+# Default models
+# Primary: Llama 3.1 70B (High Intelligence)
+# Fallback/Fast: Llama 3.1 8B
+DEFAULT_MODEL = "meta-llama/llama-3.1-70b-instruct"
+
+# Map legacy Gemini model names to OpenRouter equivalents if passed
+model_map = {
+    "gemini-2.5-flash": "meta-llama/llama-3.1-8b-instruct", # Fast
+    "gemini-2.0-flash": "meta-llama/llama-3.1-8b-instruct", # Fast
+    "gemini-2.5-pro": "meta-llama/llama-3.1-70b-instruct",  # Smart
+    "gemini-1.5-pro": "meta-llama/llama-3.1-70b-instruct",
+    "gemini-1.5-flash": "meta-llama/llama-3.1-8b-instruct",
+}
+
+EXTRA_HEADERS = {
+    "HTTP-Referer": "https://stratos-app.com", # Optional, for OpenRouter rankings
+    "X-Title": "Stratos AI",
+}
+
+def resolve_model(model):
+    """Returns the OpenRouter model ID for a (possibly legacy or empty) model name."""
+    if not model:
+        return DEFAULT_MODEL
+    return model_map.get(model, model)
+
+def _resolve_api_key(api_key):
+    if not api_key:
+        api_key = get_api_key()
+    
+    if not api_key:
+        raise ValueError("Missing API Key. Please set OPENROUTER_API_KEY.")
+    return api_key
+
+def _build_messages(prompt, system_instruction):
+    messages = []
+    if system_instruction:
+        messages.append({"role": "system", "content": system_instruction})
+    
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+# --- Token Budgeting ---
+
+# Context windows (tokens) for the models we route to
+MODEL_CONTEXT_LIMITS = {
+    "meta-llama/llama-3.1-70b-instruct": 131072,
+    "meta-llama/llama-3.1-8b-instruct": 131072,
+}
+DEFAULT_CONTEXT_LIMIT = 8192
+MESSAGE_OVERHEAD_TOKENS = 4     # Role/format tokens added per chat message
+
+_encoding = None
+
+def _get_encoding():
+    """tiktoken's cl100k_base is a close proxy for the Llama 3 tokenizer; None if not installed."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    return _encoding or None
+
+def count_tokens(text):
+    """Counts tokens in a string (falls back to ~4 chars/token without tiktoken)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+def count_prompt_tokens(prompt, system_instruction=None):
+    """Estimates input tokens for a system + user message pair."""
+    total = count_tokens(prompt) + MESSAGE_OVERHEAD_TOKENS
+    if system_instruction:
+        total += count_tokens(system_instruction) + MESSAGE_OVERHEAD_TOKENS
+    return total
+
+class UsageCounter:
+    """Process-wide tally of tokens exchanged with the API (cache hits excluded)."""
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self._lock = threading.Lock()
+
+    def add(self, input_tokens, output_tokens):
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += input_tokens or 0
+            self.output_tokens += output_tokens or 0
+
+    def snapshot(self):
+        """Returns (calls, input_tokens, output_tokens)."""
+        with self._lock:
+            return self.calls, self.input_tokens, self.output_tokens
+
+USAGE = UsageCounter()
+
+# Asks the API to end streams with a usage chunk (empty choices, usage set)
+STREAM_OPTIONS = {"include_usage": True}
+
+def _record_stream_usage(chunks, prompt, system_instruction, usage=None):
+    """Records a stream's usage block; estimates it when there is none (e.g. streams closed early, whose tokens were still generated)."""
+    if usage:
+        USAGE.add(usage.prompt_tokens, usage.completion_tokens)
+    else:
+        USAGE.add(count_prompt_tokens(prompt, system_instruction), count_tokens("".join(chunks)))
+
+def get_context_limit(model=None):
+    return MODEL_CONTEXT_LIMITS.get(resolve_model(model), DEFAULT_CONTEXT_LIMIT)
+
+def trim_to_tokens(text, max_tokens):
+    """Cuts text down to at most max_tokens, preferring a sentence boundary."""
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    
+    encoding = _get_encoding()
+    if encoding:
+        cut = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    else:
+        cut = text[:max_tokens * 4]
+    
+    boundary = max(cut.rfind(". "), cut.rfind("\n"))
+    if boundary > len(cut) * 0.8:
+        cut = cut[:boundary + 1]
+    return cut
+
+def _compress_whitespace(text):
+    text = re.sub(r"[ \t]+", " ", text)
+    return re.sub(r"\n\s*\n\s*\n+", "\n\n", text).strip()
+
+def fit_sections(sections, max_tokens):
+    """
+    Trims named prompt sections so their total fits max_tokens.
+    
+    Args:
+        sections (list): Dicts with "name", "text", "priority" (higher = kept longer)
+            and optionally "min_tokens" (never trimmed below this).
+        max_tokens (int): Budget for all sections together.
+        
+    Returns:
+        Dict of name -> (possibly trimmed) text.
+    """
+    # Whitespace is free to compress before anything is cut
+    texts = {s["name"]: _compress_whitespace(s["text"] or "") for s in sections}
+    sizes = {name: count_tokens(text) for name, text in texts.items()}
+    overflow = sum(sizes.values()) - max_tokens
+    
+    for section in sorted(sections, key=lambda s: s.get("priority", 0)):
+        if overflow <= 0:
+            break
+        name = section["name"]
+        floor = section.get("min_tokens", 0)
+        target = max(floor, sizes[name] - overflow)
+        if target < sizes[name]:
+            texts[name] = trim_to_tokens(texts[name], target)
+            new_size = count_tokens(texts[name])
+            overflow -= sizes[name] - new_size
+            sizes[name] = new_size
+    return texts
+
+def prompt_budget(model=None, system_instruction=None, reserved_output=4096):
+    """Tokens left for the user prompt once the system prompt and the expected answer are accounted for."""
+    used = MESSAGE_OVERHEAD_TOKENS
+    if system_instruction:
+        used += count_tokens(system_instruction) + MESSAGE_OVERHEAD_TOKENS
+    return max(0, get_context_limit(model) - reserved_output - used)
+
+def _make_response(content, response, model, prompt, system_instruction, started):
+    """Wraps a completion in a GeminiAdapter with measured token counts and latency."""
+    result = GeminiAdapter(content)
+    result.model = model
+    result.latency = time.time() - started
+    usage = getattr(response, "usage", None)
+    if usage:
+        result.input_tokens = usage.prompt_tokens
+        result.output_tokens = usage.completion_tokens
+    else:
+        result.input_tokens = count_prompt_tokens(prompt, system_instruction)
+        result.output_tokens = count_tokens(content)
+    return result
+
+def generate(prompt, system_instruction=None, model=None, stream=False, temperature=0.7, api_key=None, cache=None):
     """
     Generates content using OpenRouter (Llama 3 via Groq/others).
     
@@ -54,68 +350,527 @@ def generate(prompt, system_instruction=None, model=None, stream=False, temperat
         stream (bool): Whether to stream the response.
         temperature (float): Creativity.
         api_key (str): Optional API key override.
+        cache (bool): Use the response cache. None = only when temperature is 0.
         
     Returns:
-        GeminiAdapter object (if not stream) or Generator of GeminiStreamAdapter (if stream).
+        GeminiAdapter object (if not stream) or GeminiStream of GeminiStreamAdapter chunks (if stream).
     """
-    if not api_key:
-        api_key = get_api_key()
+    api_key = _resolve_api_key(api_key)
+    model = resolve_model(model)
     
-    if not api_key:
-        raise ValueError("Missing API Key. Please set OPENROUTER_API_KEY.")
-
-    client = OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=api_key,
-    )
+    response_cache = llm_cache.get_cache() if llm_cache.should_cache(cache, temperature) else None
+    cache_key = None
+    if response_cache:
+        cache_key = response_cache.make_key(model, system_instruction, prompt, temperature)
+        chunks = response_cache.get(cache_key)
+        if chunks is not None:
+            return _cached_response(chunks, stream)
     
-    # Default models
-    # Primary: Llama 3.1 70B (High Intelligence)
-    # Fallback/Fast: Llama 3.1 8B
-    if not model:
-        model = "meta-llama/llama-3.1-70b-instruct"
+    client = get_client(api_key)
+    messages = _build_messages(prompt, system_instruction)
+    
+    started = time.time()
+    try:
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            stream=stream,
+            extra_headers=EXTRA_HEADERS,
+            **({"stream_options": STREAM_OPTIONS} if stream else {})
+        )
         
-    # Map legacy Gemini model names to OpenRouter equivalents if passed
-    model_map = {
-        "gemini-2.5-flash": "meta-llama/llama-3.1-8b-instruct", # Fast
-        "gemini-2.0-flash": "meta-llama/llama-3.1-8b-instruct", # Fast
-        "gemini-2.5-pro": "meta-llama/llama-3.1-70b-instruct",  # Smart
-        "gemini-1.5-pro": "meta-llama/llama-3.1-70b-instruct",
-        "gemini-1.5-flash": "meta-llama/llama-3.1-8b-instruct",
-    }
-    
-    if model in model_map:
-        model = model_map[model]
+        if stream:
+            result = GeminiStream()
+            def stream_generator():
+                chunks = []
+                try:
+                    for chunk in response:
+                        if getattr(chunk, "usage", None):
+                            result.usage = chunk.usage
+                        if not chunk.choices:
+                            continue
+                        content = chunk.choices[0].delta.content
+                        if content:
+                            chunks.append(content)
+                            yield GeminiStreamAdapter(content)
+                finally:
+                    # Closing the generator early drops the HTTP stream, so the provider stops generating
+                    response.close()
+                    _record_stream_usage(chunks, prompt, system_instruction, result.usage)
+                # Only complete streams are cached
+                if response_cache and chunks:
+                    response_cache.put(cache_key, chunks)
+            result._chunks = stream_generator()
+            return result
+        else:
+            content = response.choices[0].message.content
+            if response_cache and content:
+                response_cache.put(cache_key, [content])
+            result = _make_response(content, response, model, prompt, system_instruction, started)
+            USAGE.add(result.input_tokens, result.output_tokens)
+            return result
+            
+    except Exception as e:
+        print(f"OpenRouter Error: {e}")
+        raise e
 
-    messages = []
-    if system_instruction:
-        messages.append({"role": "system", "content": system_instruction})
+# --- Async API ---
+
+# Async clients are bound to the event loop that created their connections,
+# so they are pooled per (loop, base_url, api_key) rather than process-wide.
+_async_clients = weakref.WeakKeyDictionary()
+
+def get_async_client(api_key, base_url=OPENROUTER_BASE_URL):
+    """Returns a pooled AsyncOpenAI client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    loop_clients = _async_clients.setdefault(loop, {})
+    key = (base_url, api_key)
+    client = loop_clients.get(key)
+    if client is None:
+        client = AsyncOpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            http_client=_build_http_client(asynchronous=True),
+        )
+        loop_clients[key] = client
+    return client
+
+async def agenerate(prompt, system_instruction=None, model=None, stream=False, temperature=0.7, api_key=None, cache=None):
+    """
+    Async version of generate().
     
-    messages.append({"role": "user", "content": prompt})
+    Returns:
+        GeminiAdapter object (if not stream) or async generator of GeminiStreamAdapter (if stream).
+    """
+    api_key = _resolve_api_key(api_key)
+    model = resolve_model(model)
+    
+    response_cache = llm_cache.get_cache() if llm_cache.should_cache(cache, temperature) else None
+    cache_key = None
+    if response_cache:
+        cache_key = response_cache.make_key(model, system_instruction, prompt, temperature)
+        chunks = response_cache.get(cache_key)
+        if chunks is not None:
+            if stream:
+                async def replay():
+                    for c in chunks:
+                        yield GeminiStreamAdapter(c)
+                return replay()
+            return _cached_response(chunks, stream)
+    
+    client = get_async_client(api_key)
+    messages = _build_messages(prompt, system_instruction)
     
+    started = time.time()
     try:
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model=model,
             messages=messages,
             temperature=temperature,
             stream=stream,
-            extra_headers={
-                "HTTP-Referer": "https://stratos-app.com", # Optional, for OpenRouter rankings
-                "X-Title": "Stratos AI",
-            }
+            extra_headers=EXTRA_HEADERS,
+            **({"stream_options": STREAM_OPTIONS} if stream else {})
         )
         
         if stream:
-            def stream_generator():
-                for chunk in response:
-                    content = chunk.choices[0].delta.content
-                    if content:
-                        yield GeminiStreamAdapter(content)
+            async def stream_generator():
+                chunks = []
+                usage = None
+                try:
+                    async for chunk in response:
+                        if getattr(chunk, "usage", None):
+                            usage = chunk.usage
+                        if not chunk.choices:
+                            continue
+                        content = chunk.choices[0].delta.content
+                        if content:
+                            chunks.append(content)
+                            yield GeminiStreamAdapter(content)
+                finally:
+                    _record_stream_usage(chunks, prompt, system_instruction, usage)
+                if response_cache and chunks:
+                    response_cache.put(cache_key, chunks)
             return stream_generator()
         else:
             content = response.choices[0].message.content
-            return GeminiAdapter(content)
+            if response_cache and content:
+                response_cache.put(cache_key, [content])
+            result = _make_response(content, response, model, prompt, system_instruction, started)
+            USAGE.add(result.input_tokens, result.output_tokens)
+            return result
             
     except Exception as e:
         print(f"OpenRouter Error: {e}")
         raise e
+
+async def _close_async_clients():
+    loop = asyncio.get_running_loop()
+    for client in _async_clients.pop(loop, {}).values():
+        try:
+            await client.close()
+        except Exception:
+            pass
+
+async def agenerate_many(prompts, concurrency=4, **kwargs):
+    """
+    Runs several independent generations concurrently (at most `concurrency` in flight).
+    
+    Args:
+        prompts (list): Each item is a prompt string, or a dict of agenerate()
+            keyword arguments (e.g. {"prompt": ..., "model": ...}).
+        concurrency (int): Maximum number of simultaneous requests.
+        **kwargs: Defaults applied to every item (model, temperature, api_key...).
+        
+    Returns:
+        List of GeminiAdapter in input order. Failed items have text=None and .error set.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    async def run_one(item):
+        call_kwargs = dict(kwargs)
+        if isinstance(item, dict):
+            call_kwargs.update(item)
+        else:
+            call_kwargs["prompt"] = item
+        call_kwargs["stream"] = False
+        
+        async with semaphore:
+            try:
+                return await agenerate(**call_kwargs)
+            except Exception as e:
+                return GeminiAdapter(None, error=e)
+    
+    return await asyncio.gather(*(run_one(item) for item in prompts))
+
+def generate_many(prompts, concurrency=4, **kwargs):
+    """
+    Synchronous wrapper around agenerate_many() for Streamlit pages and scripts.
+    Safe to call whether or not an event loop is already running in this thread.
+    """
+    async def runner():
+        try:
+            return await agenerate_many(prompts, concurrency=concurrency, **kwargs)
+        finally:
+            await _close_async_clients()
+    
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(runner())
+    
+    # Already inside a loop (e.g. notebook): run on a helper thread
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, runner()).result()
+
+# --- Fallback Policy (Hedged Requests + Circuit Breakers) ---
+
+FAST_MODEL = "meta-llama/llama-3.1-8b-instruct"
+
+# Shared worker pool for hedged attempts. Every in-flight policy call holds a
+# thread until its answer is read, so size it for the app's concurrency.
+HEDGE_WORKERS = int(os.getenv("STRATOS_LLM_WORKERS", "32"))
+_hedge_executor = concurrent.futures.ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="llm-hedge")
+
+class CircuitBreaker:
+    """
+    Skips a model after `failure_threshold` consecutive failures. Once
+    `cooldown` seconds have passed the breaker is half-open: allow() lets a
+    single trial call through, whose outcome closes the breaker or opens it
+    for another cooldown. A trial that ends without an outcome (never
+    launched, or abandoned after losing a race) is handed back with release().
+    """
+    def __init__(self, failure_threshold=2, cooldown=60.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.trial_in_flight or time.time() - self.opened_at < self.cooldown:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def release(self):
+        with self._lock:
+            self.trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+
+class LatencyTracker:
+    """Keeps a rolling window of response latencies for one model."""
+    def __init__(self, window=50):
+        self.samples = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def quantile(self, q, min_samples=5):
+        with self._lock:
+            if len(self.samples) < min_samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+# Health state is process-wide so every page and session benefits from it.
+# Streamed and non-streamed latencies measure different things
+# (first token vs. full answer), so they are tracked separately.
+_breakers = {}
+_latencies = {}
+_health_lock = threading.Lock()
+
+def get_breaker(model):
+    with _health_lock:
+        return _breakers.setdefault(model, CircuitBreaker())
+
+def get_latency_tracker(model, stream):
+    with _health_lock:
+        return _latencies.setdefault((model, bool(stream)), LatencyTracker())
+
+class _Discarded(Exception):
+    """Raised inside an attempt that lost the race and stopped reading its answer."""
+
+def _discard_attempt(future, cancelled):
+    """
+    Stops a losing attempt: cancels it if it has not started, otherwise
+    flags it so it closes its stream at the next chunk (or as soon as its
+    first chunk arrives), which ends the generation upstream.
+    """
+    cancelled.set()
+    if future.cancel():
+        return
+    
+    def close(f):
+        try:
+            result = f.result()
+        except Exception:
+            return
+        if result[0] == "stream":
+            result[2].close()
+    future.add_done_callback(close)
+
+class FallbackPolicy:
+    """
+    Declarative model fallback shared by all pages.
+    
+    Models are tried in order, skipping those whose circuit breaker is open.
+    If the current attempt has not answered in time, the next model is fired
+    in parallel and whichever answers first wins; the loser is cancelled and
+    its stream closed, so it stops generating (and billing) tokens.
+    A failed attempt immediately starts the next model.
+    
+    For streams, "answering" means delivering the first chunk, which does not
+    depend on the answer's length: the hedge fires after the model's p95
+    first-chunk latency (or `hedge_after` seconds before enough samples exist).
+    A full answer takes as long as its output is long, so a p95 learned from
+    short answers says nothing about a 2,000-word one: non-stream calls are
+    only hedged after `hedge_after_full` seconds (or the p95, if longer).
+    Non-stream attempts are read as streams internally so a loser can be
+    abandoned mid-answer.
+    """
+    def __init__(self, models, hedge_after=15.0, hedge_after_full=120.0, hedge_quantile=0.95, hedge=True):
+        self.models = list(models)
+        self.hedge_after = hedge_after
+        self.hedge_after_full = hedge_after_full
+        self.hedge_quantile = hedge_quantile
+        self.hedge = hedge
+
+    def _hedge_delay(self, model, stream):
+        if not self.hedge:
+            return None
+        observed = get_latency_tracker(model, stream).quantile(self.hedge_quantile)
+        if stream:
+            return observed if observed is not None else self.hedge_after
+        return max(observed or 0.0, self.hedge_after_full)
+
+    def _attempt(self, model, stream, kwargs, cancelled, started_at):
+        started = time.time()
+        started_at.append(started)
+        response = generate(model=model, stream=True, **kwargs)
+        first = next(response, None)
+        if stream:
+            get_latency_tracker(model, stream).record(time.time() - started)
+            return ("stream", first, response)
+        
+        parts = [first.text] if first is not None else []
+        for chunk in response:
+            if cancelled.is_set():
+                response.close()
+                raise _Discarded(f"{model} lost the race")
+            parts.append(chunk.text)
+        get_latency_tracker(model, stream).record(time.time() - started)
+        content = "".join(parts)
+        # The stream's usage block (when the provider sent one) gives the measured token counts
+        return ("response", _make_response(content, response, model, kwargs["prompt"], kwargs.get("system_instruction"), started))
+
+    def generate(self, prompt, stream=False, **kwargs):
+        """
+        Same contract as llm_client.generate() (model is chosen by the policy).
+        Raises the last error if every model fails.
+        """
+        kwargs["prompt"] = prompt
+        candidates = []
+        trials = set()  # models let through as their half-open breaker's trial call
+        for m in self.models:
+            breaker = get_breaker(m)
+            was_open = breaker.is_open
+            if breaker.allow():
+                candidates.append(m)
+                if was_open:
+                    trials.add(m)
+        candidates = candidates or list(self.models)
+        try:
+            return self._race(candidates, stream, kwargs, trials)
+        finally:
+            # Trials that never produced an outcome go back to their breaker
+            for m in trials:
+                get_breaker(m).release()
+
+    def _race(self, candidates, stream, kwargs, trials):
+        pending = {}   # future -> (model, cancelled flag)
+        last_error = None
+        
+        def launch():
+            model = candidates.pop(0)
+            print(f"   Trying model: {model}...")
+            cancelled = threading.Event()
+            started_at = []
+            future = _hedge_executor.submit(self._attempt, model, stream, kwargs, cancelled, started_at)
+            pending[future] = (model, cancelled)
+            return model, started_at
+        
+        current_model, current_started = launch()
+        while pending:
+            delay = self._hedge_delay(current_model, stream) if candidates else None
+            if delay is not None and current_started:
+                # Time spent queued for a worker thread is not the model's latency
+                delay = max(0.0, delay - (time.time() - current_started[0]))
+            done, _ = concurrent.futures.wait(list(pending), timeout=delay, return_when=concurrent.futures.FIRST_COMPLETED)
+            
+            if not done:
+                if not current_started:
+                    continue
+                # Hedge: the current model is slower than usual, race the next one
+                print(f"   ⏱️ {current_model} is slow, hedging with next model...")
+                current_model, current_started = launch()
+                continue
+            
+            failed = False
+            for future in done:
+                model, _ = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"   ❌ Failed with {model}: {e}")
+                    get_breaker(model).record_failure()
+                    trials.discard(model)
+                    last_error = e
+                    failed = True
+                    continue
+                
+                get_breaker(model).record_success()
+                trials.discard(model)
+                for loser, (_, cancelled) in pending.items():
+                    _discard_attempt(loser, cancelled)
+                
+                if result[0] == "response":
+                    return result[1]
+                
+                first, rest = result[1], result[2]
+                def stream_generator():
+                    if first is not None:
+                        yield first
+                    yield from rest
+                return stream_generator()
+            
+            if failed and candidates:
+                current_model, current_started = launch()
+        
+        raise last_error or RuntimeError("No models available.")
+
+# Shared policies used across the app
+# SMART: quality first (70B), hedged onto 8B when 70B is slow or failing
+# FAST: cheap first (8B), with 70B as the safety net
+SMART_FALLBACK = FallbackPolicy([DEFAULT_MODEL, FAST_MODEL])
+FAST_FALLBACK = FallbackPolicy([FAST_MODEL, DEFAULT_MODEL])
+
+def stream_many(requests, concurrency=4, policy=SMART_FALLBACK):
+    """
+    Streams several independent generations concurrently.
+    
+    Worker threads run the requests; events are handed back to the caller's
+    thread through a queue, so the caller (e.g. a Streamlit page) can update
+    the UI safely as chunks arrive.
+    
+    Args:
+        requests (list): Dicts of generate() keyword arguments (prompt, system_instruction...).
+        concurrency (int): Maximum number of simultaneous streams.
+        policy (FallbackPolicy): Model fallback to use; None calls generate() directly.
+        
+    Yields:
+        (index, text, error) events: a chunk (text set), completion of request
+        `index` (text and error None), or its failure (error set).
+    """
+    events = queue.Queue()
+    cancelled = threading.Event()
+    
+    def worker(index, kwargs):
+        if cancelled.is_set():
+            return
+        stream = None
+        try:
+            kwargs = dict(kwargs, stream=True)
+            stream = policy.generate(**kwargs) if policy else generate(**kwargs)
+            for chunk in stream:
+                if cancelled.is_set():
+                    return
+                events.put((index, chunk.text, None))
+            events.put((index, None, None))
+        except Exception as e:
+            events.put((index, None, e))
+        finally:
+            # Closing the stream releases its HTTP connection when the caller stopped early
+            if stream is not None and hasattr(stream, "close"):
+                stream.close()
+    
+    if not requests:
+        return
+    
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="llm-stream")
+    try:
+        for index, kwargs in enumerate(requests):
+            pool.submit(worker, index, kwargs)
+        
+        remaining = len(requests)
+        while remaining:
+            event = events.get()
+            if event[1] is None:
+                remaining -= 1
+            yield event
+    finally:
+        # The caller may stop iterating early: don't wait for the other streams
+        cancelled.set()
+        pool.shutdown(wait=False, cancel_futures=True)
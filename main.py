@@ -3,7 +3,7 @@ import sys
 try:
     import os
     from dotenv import load_dotenv
-    import google.generativeai as genai
+    import llm_client
     print("DEBUG: Imports successful.")
 except ImportError as e:
     print(f"CRITICAL ERROR: Missing dependencies. {e}")
@@ -30,16 +30,14 @@ def load_prompt(filepath):
 
 def main():
     print("🚀 Content Agent 'Viral Engine' Initializing...")
+    print("   (For many topics at once, use the batch runner: python batch.py topics.csv)")
     
     # Check for API Key
-    api_key = os.getenv("GOOGLE_API_KEY")
+    api_key = llm_client.get_api_key()
     if not api_key:
-        print("Error: GOOGLE_API_KEY not found in environment variables.")
+        print("Error: OPENROUTER_API_KEY not found in environment variables.")
         print("Please create a .env file with your API key.")
         return
-
-    # Configure Gemini
-    genai.configure(api_key=api_key)
     
     # Load System Prompt
     prompt_path = os.path.join(os.path.dirname(__file__), "prompts", "master_system_prompt.txt")
@@ -96,27 +94,6 @@ def main():
     print(f"Keywords: {keywords}\n")
     print(f"Sources Found: {len(sources)}")
 
-    # Prepare the model
-    generation_config = {
-        "temperature": 0.7,
-        "top_p": 0.95,
-        "top_k": 64,
-        "max_output_tokens": 65536,
-        "response_mime_type": "text/plain",
-    }
-    
-    # Candidate models
-    candidate_models = [
-        "gemini-2.5-flash",
-        "gemini-2.0-flash-exp",
-        "gemini-1.5-flash",
-        "gemini-1.5-flash-001",
-        "gemini-1.5-flash-latest",
-        "gemini-pro"
-    ]
-
-    print(f"\nAttempting to connect to Gemini...")
-    
     # Prepare the user message part
     user_message = f"""
 TOPIC: {topic}
@@ -133,57 +110,37 @@ If you fail this structure, the content is useless.
 
     print("\nGenerating content... This may take a moment.")
     
-    success = False
-    last_error = None
-
-    for model_name in candidate_models:
-        try:
-            print(f"Using model: {model_name}")
-            model = genai.GenerativeModel(
-                model_name=model_name,
-                generation_config=generation_config,
-                system_instruction=system_instruction
-            )
-            chat_session = model.start_chat(history=[])
-            
-            print("  ⏳ Waiting for response stream...")
-            response_stream = chat_session.send_message(user_message, stream=True)
-            
-            print("\n" + "="*30)
-            print("       GENERATED CONTENT       ")
-            print("="*30 + "\n")
-            
-            full_text = ""
-            for chunk in response_stream:
-                print(chunk.text, end="", flush=True)
-                full_text += chunk.text
-            
-            # Format References
-            references_md = "\n\n## References\n"
-            for s in sources:
-                references_md += f"- [{s.get('title', 'Source')}]({s['href']})\n"
-            
-            final_output = full_text + references_md
-            print(references_md)
-            
-            # Save to file
-            output_filename = "generated_content.md"
-            with open(output_filename, "w", encoding="utf-8") as f:
-                f.write(final_output)
-            print(f"\n\n✅ Content saved to {output_filename}")
-            success = True
-            break
-        except Exception as e:
-            print(f"Failed with {model_name}: {e}")
-            last_error = e
-            if "404" in str(e) or "not found" in str(e).lower():
-                continue
-            else:
-                break
-    
-    if not success:
+    try:
+        # Llama 3.1 70B, hedged onto 8B if slow or failing
+        response_stream = llm_client.SMART_FALLBACK.generate(
+            user_message, system_instruction=system_instruction, stream=True, api_key=api_key
+        )
+        
+        print("\n" + "="*30)
+        print("       GENERATED CONTENT       ")
+        print("="*30 + "\n")
+        
+        full_text = ""
+        for chunk in response_stream:
+            print(chunk.text, end="", flush=True)
+            full_text += chunk.text
+        
+        # Format References
+        references_md = "\n\n## References\n"
+        for s in sources:
+            references_md += f"- [{s.get('title', 'Source')}]({s['href']})\n"
+        
+        final_output = full_text + references_md
+        print(references_md)
+        
+        # Save to file
+        output_filename = "generated_content.md"
+        with open(output_filename, "w", encoding="utf-8") as f:
+            f.write(final_output)
+        print(f"\n\n✅ Content saved to {output_filename}")
+    except Exception as e:
         print("\nAll model attempts failed.")
-        print(f"Last error: {last_error}")
+        print(f"Last error: {e}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,225 @@
+import os
+import re
+import time
+import zlib
+import sqlite3
+import threading
+from email.utils import parsedate_to_datetime
+
+# Cache settings (overridable via environment)
+CACHE_ENABLED = os.getenv("STRATOS_PAGE_CACHE", "1") != "0"
+CACHE_DIR = os.getenv("STRATOS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".stratos_cache"))
+DEFAULT_FRESHNESS = float(os.getenv("STRATOS_PAGE_CACHE_FRESHNESS", "3600"))    # When the server gives no hints
+MAX_AGE = float(os.getenv("STRATOS_PAGE_CACHE_MAX_AGE", str(7 * 24 * 3600)))    # Entries older than this are evicted
+MAX_BYTES = int(os.getenv("STRATOS_PAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+def _parse_http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except Exception:
+        return None
+
+def freshness_from_headers(headers, now=None):
+    """
+    Works out how long a response may be served without revalidation.
+    Returns None if it must not be stored at all (Cache-Control: no-store).
+    """
+    now = now or time.time()
+    cache_control = headers.get("Cache-Control", "").lower()
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0.0
+
+    match = re.search(r"(?:s-maxage|max-age)\s*=\s*(\d+)", cache_control)
+    if match:
+        return float(match.group(1))
+
+    expires = _parse_http_date(headers.get("Expires", ""))
+    if expires is not None:
+        return max(0.0, expires - now)
+
+    # Heuristic freshness: 10% of the time since last modification (RFC 9111)
+    last_modified = _parse_http_date(headers.get("Last-Modified", ""))
+    if last_modified is not None:
+        return min(DEFAULT_FRESHNESS, max(0.0, (now - last_modified) * 0.1))
+
+    return DEFAULT_FRESHNESS
+
+class CachedPage:
+    """A stored response: body plus the validators needed to revalidate it."""
+    def __init__(self, url, body, etag, last_modified, fetched, expires, complete=True):
+        self.url = url
+        self.body = body
+        self.complete = complete   # False when the download stopped early (extraction budget / byte cap)
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched = fetched
+        self.expires = expires
+
+    def is_fresh(self, now=None):
+        return (now or time.time()) < self.expires
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class PageCache:
+    """
+    Persistent HTTP cache for scraped pages, backed by SQLite.
+
+    Bodies are stored zlib-compressed along with ETag / Last-Modified
+    validators. Extracted text is cached per (url, kind) next to the body,
+    so repeat hits can skip HTML parsing entirely. Entries are evicted once
+    older than MAX_AGE, and least recently used first when over MAX_BYTES.
+    """
+    def __init__(self, path, max_bytes=MAX_BYTES, max_age=MAX_AGE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.extract_hits = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched REAL NOT NULL,
+                    expires REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS extracts (
+                    url TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    PRIMARY KEY (url, kind)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_access ON pages(last_access)")
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(pages)")]
+            if "complete" not in columns:
+                conn.execute("ALTER TABLE pages ADD COLUMN complete INTEGER NOT NULL DEFAULT 1")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def lookup(self, url):
+        """Returns the CachedPage for a URL (fresh or stale), or None."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT body, etag, last_modified, fetched, expires, complete FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE pages SET last_access = ? WHERE url = ?", (time.time(), url))
+        return CachedPage(url, zlib.decompress(row[0]), row[1], row[2], row[3], row[4], bool(row[5]))
+
+    def store(self, url, body, headers, complete=True):
+        """
+        Stores a 200 response unless the server forbids it. Clears stale extracts.
+        complete=False marks a body cut short; it is only reused through its cached extracts.
+        A partial body replacing another partial body of the same page (one fetched
+        for a different extraction kind) keeps the extracts made from the first.
+        """
+        freshness = freshness_from_headers(headers)
+        if freshness is None:
+            return
+        now = time.time()
+        blob = zlib.compress(body, 6)
+        with self._lock, self._connect() as conn:
+            keep_extracts = False
+            if not complete:
+                row = conn.execute("SELECT complete, expires, etag, last_modified FROM pages WHERE url = ?", (url,)).fetchone()
+                if row is not None and not row[0]:
+                    same_page = (row[2] and row[2] == headers.get("ETag")) or (row[3] and row[3] == headers.get("Last-Modified"))
+                    keep_extracts = now < row[1] or bool(same_page)
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (url, body, etag, last_modified, fetched, expires, size, last_access, complete) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, blob, headers.get("ETag"), headers.get("Last-Modified"), now, now + freshness, len(blob), now, int(complete))
+            )
+            if not keep_extracts:
+                conn.execute("DELETE FROM extracts WHERE url = ?", (url,))
+            self._evict(conn, now)
+
+    def refresh(self, url, headers):
+        """Extends freshness after a 304 Not Modified."""
+        freshness = freshness_from_headers(headers)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE pages SET expires = ?, fetched = ?, last_access = ? WHERE url = ?",
+                (now + (freshness or 0.0), now, now, url)
+            )
+
+    def get_extract(self, url, kind):
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT text FROM extracts WHERE url = ? AND kind = ?", (url, kind)).fetchone()
+        return row[0] if row else None
+
+    def put_extract(self, url, kind, text):
+        with self._lock, self._connect() as conn:
+            if conn.execute("SELECT 1 FROM pages WHERE url = ?", (url,)).fetchone():
+                conn.execute("INSERT OR REPLACE INTO extracts (url, kind, text) VALUES (?, ?, ?)", (url, kind, text))
+
+    def _evict(self, conn, now):
+        expired = [r[0] for r in conn.execute("SELECT url FROM pages WHERE fetched < ?", (now - self.max_age,))]
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total > self.max_bytes:
+            for url, size in conn.execute("SELECT url, size FROM pages ORDER BY last_access ASC").fetchall():
+                if total <= self.max_bytes:
+                    break
+                if url not in expired:
+                    expired.append(url)
+                    total -= size
+        for url in expired:
+            conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+            conn.execute("DELETE FROM extracts WHERE url = ?", (url,))
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM pages")
+            conn.execute("DELETE FROM extracts")
+
+    def stats(self):
+        """Returns hit counters for this process plus current store size."""
+        with self._lock, self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        lookups = self.hits + self.revalidated + self.misses
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "extract_hits": self.extract_hits,
+            "hit_rate": (self.hits + self.revalidated) / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Returns the process-wide page cache, or None if caching is disabled."""
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PageCache(os.path.join(CACHE_DIR, "page_cache.sqlite"))
+    return _cache
@@ -4,6 +4,7 @@ import llm_client
 from dotenv import load_dotenv
 import utils
 import researcher
+import research_store
 
 # Load Environment
 load_dotenv()
@@ -30,6 +31,7 @@ with col2:
     st.markdown("**Data Sources:**")
     use_app_data = st.checkbox("Use 'Strategist' Data (Niche/Pillars)", value=True)
     use_custom_data = st.checkbox("Use Custom Input / Notes", value=False)
+    use_saved_research = st.checkbox("Use Saved Research (earlier Deep Research runs)", value=False)
 
 # --- 2. Posting Configuration ---
 st.markdown("### 2. Posting Configuration")
@@ -118,19 +120,25 @@ if st.button("📅 Architect My Content Empire"):
                     data, kw, src = researcher.research_topic(custom_notes, api_key)
                     context_parts.append(f"WEB RESEARCH ON NOTES:\n{data}\nKEYWORDS: {kw}")
         
+        # Part C: Saved Research matching the niche / notes / trend keyword (no new scraping)
+        if use_saved_research:
+            research_query = " ".join(filter(None, [st.session_state.get('roadmap_niche', ""), custom_notes, trend_keyword]))
+            saved = research_store.lookup(research_query, limit=2) if research_query else []
+            for record in saved:
+                context_parts.append(
+                    f"SAVED RESEARCH ({record['topic']}):\n{llm_client.trim_to_tokens(record['context'], 800)}\nKEYWORDS: {record['keywords']}"
+                )
+            if saved:
+                st.toast(f"📚 Including {len(saved)} saved research run(s).")
+            else:
+                st.warning("⚠️ No saved research matches your niche, notes or trend keyword.")
+        
         if not context_parts:
             st.error("Please select at least one data source and ensure data is available.")
         else:
             # Generate
             with st.spinner("🤖 Architecting your Content Schedule..."):
-                # llm_client handles configuration
-                
-                # Candidate models for fallback
-                candidate_models = [
-                    "meta-llama/llama-3.1-70b-instruct",
-                    "meta-llama/llama-3.1-8b-instruct"
-                ]
-                
+                # llm_client handles configuration and model fallback
                 full_context = "\n\n".join(context_parts)
                 
                 prompt = f"""
@@ -165,17 +173,14 @@ if st.button("📅 Architect My Content Empire"):
                 success = False
                 last_error = None
 
-                for model_name in candidate_models:
-                    try:
-                        # llm_client.generate returns an object with .text
-                        response = llm_client.generate(prompt, model=model_name, api_key=api_key)
-                        st.session_state['plan_content'] = response.text
-                        st.session_state['plan_generated'] = True
-                        success = True
-                        break # Stop if successful
-                    except Exception as e:
-                        last_error = e
-                        continue # Try next model
+                try:
+                    # Returns an object with .text
+                    response = llm_client.SMART_FALLBACK.generate(prompt, api_key=api_key)
+                    st.session_state['plan_content'] = response.text
+                    st.session_state['plan_generated'] = True
+                    success = True
+                except Exception as e:
+                    last_error = e
                 
                 if success:
                     utils.track_usage('LinkedIn') # Assume planning saves ~3 hours equivalent
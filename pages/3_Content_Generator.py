@@ -4,6 +4,8 @@ from dotenv import load_dotenv
 import llm_client
 import researcher
 import utils
+import job_queue
+import research_store
 
 # Load environment variables
 load_dotenv()
@@ -51,23 +53,50 @@ with col1:
 with col2:
     url_input = st.text_input("Reference URL (Optional)", placeholder="https://example.com/article")
 
+# Saved research from earlier runs (any session) that matches the topic
+if topic_input:
+    past_research = research_store.lookup(topic_input, limit=3)
+    if past_research:
+        with st.expander(f"📚 Saved Research ({len(past_research)} related)"):
+            for record in past_research:
+                st.markdown(f"**{record['topic']}** · {record['age'] / 3600:.1f}h old · {len(record['sources'])} sources")
+                st.caption(record['snippet'])
+                if st.button("Use this research", key=f"use_research_{record['id']}"):
+                    st.session_state['gen_topic'] = record['topic']
+                    st.session_state['gen_scraped_data'] = record['context']
+                    st.session_state['gen_keywords'] = record['keywords']
+                    st.session_state['gen_sources'] = record['sources']
+                    st.rerun()
+
+force_refresh = st.checkbox("Ignore saved research (re-research from scratch)", value=False)
+
 if st.button("🚀 Start Research"):
     if topic_input and api_key:
-        with st.spinner("🕵️ Deep Researching Topic & Analyzing Sources..."):
-            # Call the updated deep_research with both arguments
-            data, kw, src = researcher.research_topic(topic_input, api_key, reference_url=url_input)
-            
-            st.session_state['gen_topic'] = topic_input
-            st.session_state['gen_scraped_data'] = data
-            st.session_state['gen_keywords'] = kw
-            st.session_state['gen_sources'] = src
-            st.success("Research Complete!")
+        # Deep research runs as a background job; reruns poll it instead of restarting it
+        st.session_state['gen_research_job'] = job_queue.get_queue().submit(
+            "research", researcher.research_topic,
+            args=(topic_input,),
+            kwargs={"api_key": api_key, "reference_url": url_input, "refresh": force_refresh}
+        )
+        st.session_state['gen_research_topic'] = topic_input
             
     elif not topic_input:
         st.warning("⚠️ Please enter a Topic.")
     elif not api_key:
         st.error("Missing API Key")
 
+research_job = utils.poll_job('gen_research_job', "🕵️ Deep Researching Topic & Analyzing Sources...")
+if research_job and research_job['status'] != "done":
+    st.error(f"Research failed: {research_job['error']}")
+elif research_job:
+    data, kw, src = research_job['result']
+    
+    st.session_state['gen_topic'] = st.session_state.pop('gen_research_topic', topic_input)
+    st.session_state['gen_scraped_data'] = data
+    st.session_state['gen_keywords'] = kw
+    st.session_state['gen_sources'] = src
+    st.success("Research Complete!")
+
 # Content Generation Section
 if st.session_state['gen_scraped_data']:
     st.divider()
@@ -134,7 +163,8 @@ if st.session_state['gen_scraped_data']:
             # Prepare Model
             # llm_client handles configuration
             
-            user_message = f"""
+            def build_user_message(platforms):
+                return f"""
             TOPIC: {st.session_state['gen_topic']}
             SCRAPED CONTEXT (Facts/News): {st.session_state['gen_scraped_data']}
             SEO KEYWORDS: {st.session_state['gen_keywords']}
@@ -143,7 +173,7 @@ if st.session_state['gen_scraped_data']:
 
             *** GENERATION INSTRUCTION ***
             You must generate content ONLY for the following selected platforms:
-            {', '.join(target_platforms)}
+            {', '.join(platforms)}
             
             **CRITICAL FORMATTING RULE:**
             - Do NOT wrap the entire output in a markdown code block (i.e., do NOT use ```markdown).
@@ -151,7 +181,7 @@ if st.session_state['gen_scraped_data']:
             - Use bolding, italics, and headers to make it look "ready to publish".
             
             *** QUALITY SETTING: {"PERFECTION_MODE" if "Single" in gen_mode else "CAMPAIGN_MODE"} ***
-            {"You have ONE job. Focus ALL your creativity on this single piece. It must be VIRAL, PERFECT, and READY TO POST. No generic fluff." if "Single" in gen_mode else "Maintain consistent voice across all platforms."}
+            {"You have ONE job. Focus ALL your creativity on this single piece. It must be VIRAL, PERFECT, and READY TO POST. No generic fluff." if "Single" in gen_mode else f"This piece is part of a campaign covering: {', '.join(target_platforms)}. Maintain consistent voice across all platforms."}
             
             Do NOT generate content for any other platforms.
             
@@ -238,73 +268,99 @@ if st.session_state['gen_scraped_data']:
             - **General:** Does it maintain high standards? (No fluff, just value).
             """
         
-        st.markdown("### 👁️ Live Content Preview")
-        st.caption("This is how your content will look to your audience.")
-        
-        # Styled Container for Preview
-        with st.container(border=True):
-            output_container = st.empty()
-        
-        full_text = ""
-        
-        # Candidate models for fallback
-        candidate_models = [
-            "meta-llama/llama-3.1-70b-instruct",
-            "meta-llama/llama-3.1-8b-instruct"
-        ]
-        
-        success = False
-        last_error = None
+            st.markdown("### 👁️ Live Content Preview")
+            st.caption("This is how your content will look to your audience.")
+            
+            full_text = ""
+            
+            success = False
+            last_error = None
 
-        for model_name in candidate_models:
-            try:
-                # llm_client.generate returns a generator if stream=True
-                response_stream = llm_client.generate(
-                    prompt=user_message,
-                    system_instruction=system_instruction,
-                    model=model_name,
-                    stream=True,
-                    api_key=api_key,
-                    temperature=temperature
-                )
+            if "Single" in gen_mode or len(target_platforms) == 1:
+                # Styled Container for Preview
+                with st.container(border=True):
+                    output_container = st.empty()
+                
+                try:
+                    # Shared fallback policy: 70B first, hedged onto 8B if slow or failing
+                    response_stream = llm_client.SMART_FALLBACK.generate(
+                        prompt=build_user_message(target_platforms),
+                        system_instruction=system_instruction,
+                        stream=True,
+                        api_key=api_key,
+                        temperature=temperature
+                    )
+                    
+                    # Throttled rendering: finished paragraphs are sent once, only the tail re-renders
+                    renderer = utils.StreamRenderer(output_container)
+                    for chunk in response_stream:
+                        renderer.write(chunk.text)
+                    
+                    # Final render without cursor
+                    full_text = renderer.close()
+                    success = True
+                    
+                except Exception as e:
+                    last_error = e
+            else:
+                # Campaign Mode: one request per platform, all streaming at once.
+                # Wall-clock time approaches the slowest platform instead of the sum.
+                panels = []
+                renderers = []
+                for platform in target_platforms:
+                    with st.container(border=True):
+                        st.markdown(f"#### {platform}")
+                        panels.append(st.empty())
+                        renderers.append(utils.StreamRenderer(panels[-1]))
+                
+                platform_requests = [{
+                    "prompt": build_user_message([platform]),
+                    "system_instruction": system_instruction,
+                    "api_key": api_key,
+                    "temperature": temperature,
+                } for platform in target_platforms]
+                
+                texts = [""] * len(target_platforms)
+                failed = [False] * len(target_platforms)
                 
-                for chunk in response_stream:
-                    full_text += chunk.text
-                    output_container.markdown(full_text + "▌")
+                for i, text, error in llm_client.stream_many(platform_requests, concurrency=len(platform_requests)):
+                    if error is not None:
+                        failed[i] = True
+                        last_error = error
+                        panels[i].error(f"{target_platforms[i]} failed: {error}")
+                    elif text is not None:
+                        renderers[i].write(text)
+                    else:
+                        texts[i] = renderers[i].close()
                 
-                # Final render without cursor
-                output_container.markdown(full_text)
+                # Assemble the combined campaign document
+                parts = [f"## {platform}\n\n{texts[i]}" for i, platform in enumerate(target_platforms) if not failed[i] and texts[i]]
+                full_text = "\n\n---\n\n".join(parts)
+                success = bool(parts)
+            
+            if not success:
+                st.error(f"Generation Failed: All models failed. Last error: {last_error}")
                 
+            if success:
                 # Copy to Clipboard Feature
                 st.markdown("---")
                 st.markdown("### 📋 Raw Text (For Copying)")
                 st.code(full_text, language="markdown")
                 st.caption("Click the copy icon in the top right of the code block above to copy everything!")
-                success = True
-                break # Stop if successful
                 
-            except Exception as e:
-                last_error = e
-                continue # Try next model
-        
-        if not success:
-            st.error(f"Generation Failed: All models failed. Last error: {last_error}")
-            
-        if success:
-            # References
-            st.markdown("### 📚 References")
-            for s in st.session_state['gen_sources']:
-                st.markdown(f"- [{s.get('title', 'Source')}]({s['href']})")
-                
-            # Download
-            # Download
-            docx_file = utils.create_docx(full_text)
-            st.download_button(
-                label="📄 Download Content (Word Doc)",
-                data=docx_file,
-                file_name="generated_content.docx",
-                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            )
+                # References
+                st.markdown("### 📚 References")
+                for s in st.session_state['gen_sources']:
+                    st.markdown(f"- [{s.get('title', 'Source')}]({s['href']})")
+                    
+                # Download
+                docx_file = utils.create_docx(full_text)
+                st.download_button(
+                    label="📄 Download Content (Word Doc)",
+                    data=docx_file,
+                    file_name="generated_content.docx",
+                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+                )
 
 # Show Impact Metrics
 utils.display_impact_metrics()
@@ -1,7 +1,9 @@
 import streamlit as st
 import researcher
+import fetcher
 import llm_client
 import utils
+import job_queue
 import time
 
 # --- Configuration ---
@@ -23,6 +25,89 @@ st.markdown("""
 # --- Session State ---
 if 'rep_content' not in st.session_state: st.session_state['rep_content'] = ""
 
+# Using 70b (High Intelligence) is mandatory for the synthesis
+SYNTHESIS_MODEL = "meta-llama/llama-3.1-70b-instruct"
+SYNTHESIS_OUTPUT_TOKENS = 6000 # Reserved for the answer: a 2,000+ word article plus the 500-800 word data engine
+DNA_OUTPUT_TOKENS = 1024       # Reserved for each DNA summary (under 400 words)
+
+def synthesize(user_prompt, system_prompt, api_key=None, job=None):
+    """The Reduce step, run as a background job: streams the article into the job handle."""
+    stream = llm_client.generate(user_prompt, system_prompt, model=SYNTHESIS_MODEL, stream=True, api_key=api_key)
+    
+    parts = []
+    for chunk in stream:
+        if hasattr(chunk, 'choices') and chunk.choices: # OpenRouter standard chunk
+            content = chunk.choices[0].delta.content
+        elif hasattr(chunk, 'text'): # Custom wrapper
+            content = chunk.text
+        else:
+            content = None
+        if content:
+            parts.append(content)
+            if job:
+                job.write(content)
+    return "".join(parts)
+
+def build_dna_prompt(target_keyword, article):
+    """The Map prompt: distills one competitor article into its structural "DNA"."""
+    return f"""
+    TARGET KEYWORD: {target_keyword}
+    
+    Extract the "DNA" of this competitor article as compact Markdown:
+    1. OUTLINE: Its H1/H2/H3 heading structure, in order.
+    2. KEY FACTS: Every statistic, number, date, name, product and claim (bullet list).
+    3. TABLES: Any comparison tables, reproduced as Markdown tables.
+    4. ANGLES: What it does well, and what it misses (2-4 bullets).
+    5. FAQ: Questions it answers.
+    Keep it under 400 words. No commentary.
+    
+    ARTICLE:
+    {article}
+    """
+
+def build_synthesis_prompt(target_keyword, user_data, user_angle, competitor_block):
+    """The Reduce prompt (the REPLICATOR): competitor DNA + the user's own knowledge."""
+    return f"""
+    TARGET KEYWORD: {target_keyword}
+    MY SPECIFIC KNOWLEDGE: {user_data}
+    MY BRAND TONE: {user_angle}
+    
+    Here is the Structural DNA of the Top Ranking Competitors (outlines, facts, tables):
+    {competitor_block} 
+    
+    *** MISSION ***
+    1. ANALYZE the competitors for STRUCTURE and RANKING FACTORS.
+    2. USE their structure, BUT...
+    3. FILL it with *MY SPECIFIC KNOWLEDGE* (provided above). 
+    *** CRITICAL: COHESION & FLOW ***
+    - The final article must read as **ONE unified voice**. 
+    - Do NOT simply append sections from different competitors like a "Frankenstein" monster. 
+    - You must **weave** them together with smooth transitions. 
+    - The reader should NOT be able to tell this came from multiple sources.
+    
+    *** OUTPUT REQUIREMENTS ***
+    
+    PART 1: THE AUTHORITY BLOG POST (The "Skyscraper")
+    - Length: **2,000+ Words**.
+    - Structure: Use the combined H2/H3 structure from the competitors, but organize it more logically.
+    - Depth: If Competitor A has a definition and Competitor B has an example, you must include ALL OF IT.
+    - Tone: Professional, authoritative, yet engaging.
+    
+    PART 2: THE AEO "DATA ENGINE" (For AI Search)
+    - This section is designed specifically for AI Bots (Perplexity, Google SGE) to read.
+    - **Length:** 500-800 Words of Pure Structured Data.
+    - Format:
+      - **Direct Answer Block:** A 50-word perfect definition of the query.
+      - **Comparison Tables:** Compare products/methods using Markdown Tables.
+      - **Bullet Lists:** "Top 10 Factors", "Key Statistics".
+      - **FAQ Schema:** 5 Questions users ask, with direct answers.
+    
+    *** FORMATTING ***
+    - Use clear Markdown (# H1, ## H2).
+    - Do NOT use code blocks.
+    - Make it "Ready to Publish".
+    """
+
 # --- Inputs ---
 st.markdown("### 1. Source Material (The Competition)")
 target_keyword = st.text_input("Target Keyword *", placeholder="e.g. Best Solar Panels in Nigeria")
@@ -37,19 +122,20 @@ if input_method == "URLs (Auto-Scrape)":
     with c2: url2 = st.text_input("Competitor URL #2")
     with c3: url3 = st.text_input("Competitor URL #3")
     
+    more_urls = st.text_area("More Competitor URLs (Optional, one per line)", height=100)
+    
     if url1: competitors.append({"type": "url", "data": url1})
     if url2: competitors.append({"type": "url", "data": url2})
     if url3: competitors.append({"type": "url", "data": url3})
+    for line in more_urls.splitlines():
+        if line.strip(): competitors.append({"type": "url", "data": line.strip()})
 
 else:
     st.info("💡 Use this if the URL scraper is being blocked.")
-    t1 = st.text_area("Competitor Text #1", height=150)
-    t2 = st.text_area("Competitor Text #2", height=150)
-    t3 = st.text_area("Competitor Text #3", height=150)
-    
-    if t1: competitors.append({"type": "text", "data": t1})
-    if t2: competitors.append({"type": "text", "data": t2})
-    if t3: competitors.append({"type": "text", "data": t3})
+    num_texts = st.number_input("Number of Competitor Texts", min_value=1, max_value=10, value=3)
+    for n in range(int(num_texts)):
+        t = st.text_area(f"Competitor Text #{n+1}", height=150)
+        if t: competitors.append({"type": "text", "data": t})
 
 st.markdown("### 2. Your Knowledge Extraction")
 st.info("💡 The AI will copy the *Structure* of competitors, but it needs *Your Facts* to make it original.")
@@ -73,93 +159,124 @@ if st.button("🧬 Replicate & Upgrade content"):
             status_container = st.empty()
             
             # 1. Scrape / Gather Data
-            analyzed_content = ""
+            competitor_texts = [] # (label, raw content)
             
             with st.spinner("🕵️ Extracting Competitor DNA..."):
+                # Scrape every URL source in parallel (structured scraper), reporting each as it lands
+                url_indexes = [i for i, comp in enumerate(competitors) if comp['type'] == 'url']
+                progress = {i: "⏳" for i in url_indexes}
+                
+                def show_progress():
+                    status_container.markdown("  \n".join(
+                        f"{progress[i]} **Source {i+1}:** {competitors[i]['data']}" for i in url_indexes
+                    ))
+                
+                def on_scraped(n, url, content):
+                    progress[url_indexes[n]] = "✅" if content else "❌"
+                    show_progress()
+                
+                scraped = {}
+                if url_indexes:
+                    show_progress()
+                    results = fetcher.fetch_all(
+                        [competitors[i]['data'] for i in url_indexes],
+                        researcher.scrape_content_with_markdown,
+                        on_result=on_scraped
+                    )
+                    scraped = dict(zip(url_indexes, results))
+                
                 for i, comp in enumerate(competitors):
-                    status_container.markdown(f"**Analyzing Source {i+1}...**")
-                    
                     if comp['type'] == 'url':
-                        # Use the NEW structured scraper
-                        content = researcher.scrape_content_with_markdown(comp['data'])
+                        content = scraped.get(i)
                         if content:
-                            analyzed_content += f"\n--- COMPETITOR {i+1} ({comp['data']}) ---\n{content}\n"
+                            competitor_texts.append((f"COMPETITOR {i+1} ({comp['data']})", content))
                         else:
                             st.warning(f"Failed to scrape Source {i+1}. Skipping.")
                     else:
-                        analyzed_content += f"\n--- COMPETITOR {i+1} (Manual Text) ---\n{comp['data']}\n"
+                        competitor_texts.append((f"COMPETITOR {i+1} (Manual Text)", comp['data']))
             
-            if not analyzed_content:
+            if not competitor_texts:
                 st.error("Could not extract any content from sources.")
             else:
-                # 2. The REPLICATOR Prompt
-                system_prompt = "You are an Elite SEO Editor and Content Strategist. Your job is to execute the 'Skyscraper Technique'."
-                
-                user_prompt = f"""
-                TARGET KEYWORD: {target_keyword}
-                MY SPECIFIC KNOWLEDGE: {user_data}
-                MY BRAND TONE: {user_angle}
+                # 2. MAP: Distill each competitor into a compact "DNA" summary, concurrently, with the fast model
+                stage_stats = []
+                dna_system = "You are an SEO analyst. You extract the structure and substance of an article, never its wording."
+                # Scraped extracts are already capped (6000 chars); only pasted text can be long,
+                # so each source is trimmed to what the map model's context leaves for the article
+                article_budget = llm_client.prompt_budget(llm_client.FAST_MODEL, dna_system, reserved_output=DNA_OUTPUT_TOKENS)
+                article_budget -= llm_client.count_tokens(build_dna_prompt(target_keyword, ""))
+                dna_prompts = [
+                    build_dna_prompt(target_keyword, llm_client.trim_to_tokens(content, article_budget))
+                    for _, content in competitor_texts
+                ]
                 
-                Here is the Raw Content from the Top Ranking Competitors:
-                {analyzed_content[:25000]} 
-                
-                *** MISSION ***
-                1. ANALYZE the competitors for STRUCTURE and RANKING FACTORS.
-                2. USE their structure, BUT...
-                3. FILL it with *MY SPECIFIC KNOWLEDGE* (provided above). 
-                *** CRITICAL: COHESION & FLOW ***
-                - The final article must read as **ONE unified voice**. 
-                - Do NOT simply append sections from different competitors like a "Frankenstein" monster. 
-                - You must **weave** them together with smooth transitions. 
-                - The reader should NOT be able to tell this came from multiple sources.
-                
-                *** OUTPUT REQUIREMENTS ***
+                with st.spinner(f"🧬 Distilling DNA from {len(competitor_texts)} sources..."):
+                    started = time.time()
+                    dna_results = llm_client.generate_many(
+                        dna_prompts,
+                        concurrency=min(8, len(dna_prompts)),
+                        system_instruction=dna_system,
+                        model=llm_client.FAST_MODEL,
+                        temperature=0,
+                        api_key=api_key
+                    )
+                    
+                    dna_blocks = []
+                    map_in, map_out = 0, 0
+                    for (label, content), result in zip(competitor_texts, dna_results):
+                        if result.error is None and result.text:
+                            dna_blocks.append(f"--- {label} ---\n{result.text}")
+                            map_in += result.input_tokens or 0
+                            map_out += result.output_tokens or 0
+                        else:
+                            # Fall back to a trimmed slice of the raw text for this source
+                            st.warning(f"DNA extraction failed for {label}; using raw excerpt.")
+                            dna_blocks.append(f"--- {label} (raw excerpt) ---\n{llm_client.trim_to_tokens(content, 1500)}")
+                    stage_stats.append(("Map: DNA extraction", time.time() - started, map_in, map_out))
                 
-                PART 1: THE AUTHORITY BLOG POST (The "Skyscraper")
-                - Length: **2,000+ Words**.
-                - Structure: Use the combined H2/H3 structure from the competitors, but organize it more logically.
-                - Depth: If Competitor A has a definition and Competitor B has an example, you must include ALL OF IT.
-                - Tone: Professional, authoritative, yet engaging.
+                analyzed_content = "\n\n".join(dna_blocks)
                 
-                PART 2: THE AEO "DATA ENGINE" (For AI Search)
-                - This section is designed specifically for AI Bots (Perplexity, Google SGE) to read.
-                - **Length:** 500-800 Words of Pure Structured Data.
-                - Format:
-                  - **Direct Answer Block:** A 50-word perfect definition of the query.
-                  - **Comparison Tables:** Compare products/methods using Markdown Tables.
-                  - **Bullet Lists:** "Top 10 Factors", "Key Statistics".
-                  - **FAQ Schema:** 5 Questions users ask, with direct answers.
+                # 3. REDUCE: The REPLICATOR Prompt
+                system_prompt = "You are an Elite SEO Editor and Content Strategist. Your job is to execute the 'Skyscraper Technique'."
                 
-                *** FORMATTING ***
-                - Use clear Markdown (# H1, ## H2).
-                - Do NOT use code blocks.
-                - Make it "Ready to Publish".
-                """
+                # Token budget: what the synthesis model's context leaves after the system prompt,
+                # the instructions and the reserved answer. Competitor DNA gives way before the user's own knowledge does.
+                budget = llm_client.prompt_budget(SYNTHESIS_MODEL, system_prompt, reserved_output=SYNTHESIS_OUTPUT_TOKENS)
+                budget -= llm_client.count_tokens(build_synthesis_prompt(target_keyword, "", user_angle, ""))
+                sections = llm_client.fit_sections([
+                    {"name": "competitors", "text": analyzed_content, "priority": 1, "min_tokens": 1500},
+                    {"name": "user_data", "text": user_data, "priority": 2},
+                ], max_tokens=budget)
+                user_prompt = build_synthesis_prompt(target_keyword, sections["user_data"], user_angle, sections["competitors"])
                 
-                # 3. Generate
-                with st.spinner("🧬 Synthesizing Super-Article... (This requires deep thought)"):
-                    try:
-                        # Using 70b (High Intelligence) is mandatory here
-                        stream = llm_client.generate(user_prompt, system_prompt, model="meta-llama/llama-3.1-70b-instruct", stream=True, api_key=api_key)
-                        
-                        full_text = ""
-                        output_container = st.empty()
-                        
-                        for chunk in stream:
-                            if hasattr(chunk, 'choices') and chunk.choices: # OpenRouter standard chunk
-                                content = chunk.choices[0].delta.content
-                                if content:
-                                    full_text += content
-                                    output_container.markdown(full_text + "▌")
-                            elif hasattr(chunk, 'text'): # Custom wrapper
-                                full_text += chunk.text
-                                output_container.markdown(full_text + "▌")
-                                
-                        output_container.markdown(full_text)
-                        st.session_state['rep_content'] = full_text
-                        
-                    except Exception as e:
-                        st.error(f"Generation Failed: {e}")
+                # 4. Generate in the background; reruns poll the job and show the article as it streams
+                st.session_state['rep_stats'] = stage_stats
+                st.session_state['rep_prompt_tokens'] = llm_client.count_prompt_tokens(user_prompt, system_prompt)
+                st.session_state['rep_job'] = job_queue.get_queue().submit(
+                    "alchemist_synthesis", synthesize,
+                    args=(user_prompt, system_prompt),
+                    kwargs={"api_key": api_key},
+                    with_job=True
+                )
+
+rep_job = utils.poll_job('rep_job', "🧬 Synthesizing Super-Article... (This requires deep thought)")
+if rep_job and rep_job['status'] != "done":
+    st.error(f"Generation Failed: {rep_job['error']}")
+elif rep_job:
+    full_text = rep_job['result']
+    st.session_state['rep_content'] = full_text
+    st.session_state.setdefault('rep_stats', []).append((
+        "Reduce: Synthesis",
+        rep_job['elapsed'],
+        st.session_state.get('rep_prompt_tokens', 0),
+        llm_client.count_tokens(full_text)
+    ))
+
+# Pipeline Report
+if st.session_state.get('rep_stats'):
+    with st.expander("⏱️ Pipeline Stats"):
+        for stage, seconds, tokens_in, tokens_out in st.session_state['rep_stats']:
+            st.markdown(f"- **{stage}:** {seconds:.1f}s · {tokens_in:,} tokens in · {tokens_out:,} tokens out")
 
 # --- Output Actions ---
 if st.session_state['rep_content']:
@@ -0,0 +1,203 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import context_packer
+
+# Store settings (overridable via environment)
+STORE_ENABLED = os.getenv("STRATOS_RESEARCH_STORE", "1") != "0"
+CACHE_DIR = os.getenv("STRATOS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".stratos_cache"))
+FRESH_AGE = float(os.getenv("STRATOS_RESEARCH_FRESH_AGE", str(12 * 3600)))          # Reused as-is
+REFRESH_AGE = float(os.getenv("STRATOS_RESEARCH_REFRESH_AGE", str(7 * 24 * 3600)))  # Refreshed incrementally
+MAX_AGE = float(os.getenv("STRATOS_RESEARCH_MAX_AGE", str(30 * 24 * 3600)))         # Deleted after this
+
+# Topics whose term sets overlap at least this much count as the same research
+NEAR_DUPLICATE_TOPIC = 0.8
+
+def normalize_topic(topic):
+    return " ".join((topic or "").lower().split())
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+def _topic_terms(topic):
+    """
+    Terms that identify a topic. Unlike context_packer.tokenize, short and numeric
+    tokens are kept: "AI tools" vs "VR tools" or "iPhone 15" vs "iPhone 16" differ only in them.
+    """
+    return set(w for w in _WORD_RE.findall((topic or "").lower()) if w not in context_packer.STOPWORDS)
+
+def _overlap(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+def _match_query(text):
+    """FTS5 MATCH expression: any of the text's terms (quoted, so user input cannot inject syntax)."""
+    terms = sorted(_topic_terms(text))
+    return " OR ".join(f'"{t}"' for t in terms)
+
+class ResearchStore:
+    """
+    Persistent store of deep_research runs, backed by SQLite with an FTS5 index.
+
+    Each run keeps its topic, reference URL, assembled context, keywords,
+    sources and the extracted text of every source, so a later run can
+    reuse it outright (fresh), refresh it incrementally (only new sources
+    are scraped), or pages can search across everything researched so far.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS research (
+                    id INTEGER PRIMARY KEY,
+                    topic TEXT NOT NULL,
+                    topic_norm TEXT NOT NULL,
+                    reference_url TEXT NOT NULL DEFAULT '',
+                    context TEXT NOT NULL,
+                    keywords TEXT NOT NULL,
+                    sources TEXT NOT NULL,
+                    documents TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    UNIQUE (topic_norm, reference_url)
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS research_fts USING fts5(
+                    topic, keywords, context, content='research', content_rowid='id'
+                );
+                CREATE TRIGGER IF NOT EXISTS research_ai AFTER INSERT ON research BEGIN
+                    INSERT INTO research_fts(rowid, topic, keywords, context) VALUES (new.id, new.topic, new.keywords, new.context);
+                END;
+                CREATE TRIGGER IF NOT EXISTS research_ad AFTER DELETE ON research BEGIN
+                    INSERT INTO research_fts(research_fts, rowid, topic, keywords, context) VALUES ('delete', old.id, old.topic, old.keywords, old.context);
+                END;
+                CREATE TRIGGER IF NOT EXISTS research_au AFTER UPDATE ON research BEGIN
+                    INSERT INTO research_fts(research_fts, rowid, topic, keywords, context) VALUES ('delete', old.id, old.topic, old.keywords, old.context);
+                    INSERT INTO research_fts(rowid, topic, keywords, context) VALUES (new.id, new.topic, new.keywords, new.context);
+                END;
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    _COLUMNS = "id, topic, reference_url, context, keywords, sources, documents, created, updated"
+
+    @staticmethod
+    def _record(row):
+        record_id, topic, reference_url, context, keywords, sources, documents, created, updated = row
+        return {
+            "id": record_id,
+            "topic": topic,
+            "reference_url": reference_url or None,
+            "context": context,
+            "keywords": keywords,
+            "sources": json.loads(sources),
+            "documents": json.loads(documents),
+            "created": created,
+            "updated": updated,
+            "age": time.time() - updated,
+        }
+
+    def save(self, topic, context, keywords, sources, documents, reference_url=None):
+        """
+        Saves (or replaces) the research for a topic + reference URL.
+        documents: [{'label', 'title', 'href', 'text'}] — the extracted text per source.
+        """
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                INSERT INTO research (topic, topic_norm, reference_url, context, keywords, sources, documents, created, updated)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (topic_norm, reference_url) DO UPDATE SET
+                    topic = excluded.topic, context = excluded.context, keywords = excluded.keywords,
+                    sources = excluded.sources, documents = excluded.documents, updated = excluded.updated
+            """, (
+                topic, normalize_topic(topic), reference_url or "", context, keywords,
+                json.dumps(sources, ensure_ascii=False), json.dumps(documents, ensure_ascii=False), now, now
+            ))
+            conn.execute("DELETE FROM research WHERE updated < ?", (now - MAX_AGE,))
+
+    def find(self, topic, reference_url=None, max_age=REFRESH_AGE):
+        """
+        Returns the newest record for the same or a near-identical topic
+        (term overlap >= NEAR_DUPLICATE_TOPIC) and the same reference URL,
+        no older than max_age. None if there is none.
+        record['exact'] is True only when the normalized topics are equal; a
+        near-identical record may seed an incremental refresh but must not be
+        served as the research for this topic.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {self._COLUMNS} FROM research WHERE topic_norm = ? AND reference_url = ?",
+                (normalize_topic(topic), reference_url or "")
+            ).fetchone()
+            candidates = [row] if row else []
+            query = _match_query(topic)
+            if not candidates and query:
+                candidates = conn.execute(f"""
+                    SELECT {', '.join('r.' + c.strip() for c in self._COLUMNS.split(','))}
+                    FROM research_fts JOIN research r ON r.id = research_fts.rowid
+                    WHERE research_fts MATCH ? AND r.reference_url = ?
+                    ORDER BY r.updated DESC LIMIT 20
+                """, (f"topic : ({query})", reference_url or "")).fetchall()
+
+        wanted = _topic_terms(topic)
+        for row in candidates:
+            record = self._record(row)
+            if record["age"] > max_age:
+                continue
+            record["exact"] = normalize_topic(record["topic"]) == normalize_topic(topic)
+            if record["exact"] or _overlap(wanted, _topic_terms(record["topic"])) >= NEAR_DUPLICATE_TOPIC:
+                return record
+        return None
+
+    def search(self, query, limit=5, max_age=MAX_AGE):
+        """
+        Full-text search over topics, keywords and context (BM25-ranked, topic matches weigh most).
+        Returns records with an extra 'snippet' field.
+        """
+        match = _match_query(query)
+        if not match:
+            return []
+        with self._connect() as conn:
+            rows = conn.execute(f"""
+                SELECT {', '.join('r.' + c.strip() for c in self._COLUMNS.split(','))},
+                       snippet(research_fts, 2, '**', '**', ' … ', 24)
+                FROM research_fts JOIN research r ON r.id = research_fts.rowid
+                WHERE research_fts MATCH ? AND r.updated >= ?
+                ORDER BY bm25(research_fts, 10.0, 3.0, 1.0)
+                LIMIT ?
+            """, (match, time.time() - max_age, limit)).fetchall()
+        results = []
+        for row in rows:
+            record = self._record(row[:-1])
+            record["snippet"] = row[-1]
+            results.append(record)
+        return results
+
+    def recent(self, limit=10):
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT {self._COLUMNS} FROM research ORDER BY updated DESC LIMIT ?", (limit,)).fetchall()
+        return [self._record(row) for row in rows]
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Returns the process-wide research store, or None if it is disabled."""
+    global _store
+    if not STORE_ENABLED:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ResearchStore(os.path.join(CACHE_DIR, "research.sqlite"))
+    return _store
+
+def lookup(query, limit=5):
+    """Page-facing search over saved research; [] when the store is disabled."""
+    store = get_store()
+    return store.search(query, limit=limit) if store else []
@@ -1,30 +1,24 @@
-import requests
 from bs4 import BeautifulSoup
 from duckduckgo_search import DDGS
 import llm_client
+import fetcher
+import stealth
+import extractor
+import context_packer
+import task_runner
+import search_cache
+import research_store
+import dedup
 import os
-import time
-import random
-from fake_useragent import UserAgent
+
+# Seconds allowed for Phases 1 & 2 together
+RESEARCH_DEADLINE = 45
 
 def get_stealth_headers():
-    """Generates random headers to mimic a real browser."""
-    try:
-        ua = UserAgent()
-        user_agent = ua.random
-    except:
-        user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        
-    return {
-        'User-Agent': user_agent,
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Referer': 'https://www.google.com/',
-        'DNT': '1',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-    }
+    """Returns random headers to mimic a real browser (from the shared rotating pool)."""
+    return stealth.get_headers()
 
+@search_cache.cached("google_news")
 def search_google_news(query, max_results=3):
     """Searches Google News via RSS feed."""
     print(f"  📰 Searching Google News for: {query}...")
@@ -32,7 +26,7 @@ def search_google_news(query, max_results=3):
     results = []
     try:
         # Google News RSS usually accepts standard requests, but stealth doesn't hurt
-        response = requests.get(rss_url, headers=get_stealth_headers(), timeout=10)
+        response = fetcher.get(rss_url, headers=get_stealth_headers(), timeout=10)
         response.raise_for_status()
         soup = BeautifulSoup(response.content, 'xml')
         items = soup.find_all('item', limit=max_results)
@@ -56,16 +50,23 @@ def search_web(query, max_results=3):
     results.extend(google_results)
 
     # 2. DuckDuckGo (Great for general facts)
+    results.extend(search_duckduckgo(query, max_results=2))
+        
+    return results
+
+@search_cache.cached("ddg_text")
+def search_duckduckgo(query, max_results=2):
+    """Searches DuckDuckGo web results."""
+    results = []
     try:
         with DDGS() as ddgs:
-            ddg_gen = ddgs.text(query, max_results=2)
-            for r in ddg_gen:
+            for r in ddgs.text(query, max_results=max_results):
                 results.append(r)
     except Exception as e:
         print(f"  ❌ DuckDuckGo search failed: {e}")
-        
     return results
 
+@search_cache.cached("ddg_news")
 def find_trending_news(topic):
     """
     Finds 'Breaking News' (Last 3 Days) for a topic.
@@ -84,34 +85,28 @@ def find_trending_news(topic):
         
     return results
 
+def extract_text(html):
+    """Extracts the main visible text from raw HTML (boilerplate stripped, max 3000 chars)."""
+    return extractor.extract(html, budget=3000, mode="text", suffix="...")
+
 def scrape_content(url):
     """Scrapes the main text content from a URL using stealth headers."""
     print(f"  ⬇️ Scraping (Stealth): {url}...")
     try:
-        # Random delay to be polite and avoid some rate limits
-        time.sleep(random.uniform(0.5, 1.5))
-        
-        response = requests.get(url, headers=get_stealth_headers(), timeout=15)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header", "aside", "iframe"]):
-            script.decompose()
-            
-        text = soup.get_text(separator=' ', strip=True)
-        
-        # Clean up whitespace
-        text = ' '.join(text.split())
-        
-        # Limit content length
-        return text[:3000] + "..." if len(text) > 3000 else text
+        # Served from the page cache when possible; per-host delay otherwise
+        return fetcher.fetch_extract(
+            url, "text", extract_text, headers=get_stealth_headers(), timeout=15,
+            stream_fn=lambda: extractor.StreamingExtractor(3000, "text", suffix="...")
+        )
         
     except Exception as e:
         print(f"  ⚠️ Could not scrape {url}: {e}")
         return ""
 
+def extract_markdown(html):
+    """Extracts text from raw HTML, keeping headers and lists as Markdown."""
+    return extractor.extract(html, budget=6000, mode="markdown") # Allow more context for structure analysis
+
 def scrape_content_with_markdown(url):
     """
     Scrapes URL but preserves STRUCTURE (headers, lists) as Markdown.
@@ -119,55 +114,38 @@ def scrape_content_with_markdown(url):
     """
     print(f"  🧬 Scraping Structure (Stealth): {url}...")
     try:
-        time.sleep(random.uniform(0.5, 1.5))
-        response = requests.get(url, headers=get_stealth_headers(), timeout=15)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Cleanup
-        for tag in soup(["script", "style", "nav", "footer", "header", "aside", "iframe", "noscript"]):
-            tag.decompose()
-            
-        # Convert Headers to Markdown
-        for h in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-            level = int(h.name[1])
-            h.string = f"\n{'#' * level} {h.get_text().strip()}\n"
-            
-        # Convert Lists
-        for li in soup.find_all('li'):
-            li.string = f"- {li.get_text().strip()}\n"
-            
-        text = soup.get_text(separator=' ', strip=True)
-        return text[:6000] # Allow more context for structure analysis
+        return fetcher.fetch_extract(
+            url, "markdown", extract_markdown, headers=get_stealth_headers(), timeout=15,
+            stream_fn=lambda: extractor.StreamingExtractor(6000, "markdown")
+        )
         
     except Exception as e:
         print(f"  ⚠️ Structure scrape failed: {url} -> {e}")
         return ""
 
-def generate_keywords(topic, context, api_key):
-    """Uses OpenRouter to generate SEO keywords."""
+def generate_keywords(topic, context, api_key, suggestions=None):
+    """
+    Uses OpenRouter to generate SEO keywords.
+    The context is packed against the topic plus the autocomplete suggestions,
+    so the passages kept are the ones that match what people search for.
+    """
     print("  🔑 Generating SEO keywords...")
     
     prompt = f"""
     Based on the following topic and context, generate a comma-separated list of 10 high-impact SEO keywords and phrases.
     TOPIC: {topic}
-    CONTEXT: {context[:3000]}
+    CONTEXT: {context_packer.pack([context], [topic] + list(suggestions or []), max_tokens=750)}
     OUTPUT FORMAT: keyword1, keyword2, keyword3...
     """
 
-    # Fallback model list
-    candidate_models = ["meta-llama/llama-3.1-8b-instruct", "meta-llama/llama-3.1-70b-instruct"]
-    
-    for model_name in candidate_models:
-        try:
-            response = llm_client.generate(prompt, model=model_name, api_key=api_key)
-            return response.text.strip()
-        except:
-            continue
-            
-    return f"{topic}, viral content, trending, {topic} news"
+    try:
+        # Same topic + context yields interchangeable keywords, so reuse cached answers
+        response = llm_client.FAST_FALLBACK.generate(prompt, api_key=api_key, cache=True)
+        return response.text.strip()
+    except:
+        return f"{topic}, viral content, trending, {topic} news"
 
+@search_cache.cached("autocomplete")
 def get_google_suggestions(query):
     """
     Fetches real-time search suggestions from Google Autocomplete (Free).
@@ -176,7 +154,7 @@ def get_google_suggestions(query):
     print(f"  🔮 Fetching Google Autocomplete for: {query}...")
     url = f"http://suggestqueries.google.com/complete/search?client=chrome&q={query}"
     try:
-        response = requests.get(url, headers=get_stealth_headers(), timeout=5)
+        response = fetcher.get(url, headers=get_stealth_headers(), timeout=5)
         if response.status_code == 200:
             data = response.json()
             # data[1] contains the list of suggestions
@@ -186,51 +164,116 @@ def get_google_suggestions(query):
         print(f"  ⚠️ Autocomplete failed: {e}")
     return []
 
-def deep_research(topic, api_key, reference_url=None):
+def deep_research(topic, api_key, reference_url=None, refresh=False):
     """
     Performs 'Intent-First' Deep Research.
     1. User Intent (Google Autocomplete) - What they WANT.
     2. Competitor Content (Web Search) - What EXISTS.
     3. Gap Analysis - The Opportunity.
+    
+    Runs are saved to the research store. A fresh run for the same topic is
+    returned as-is; an older one, or one for a near-identical topic, is
+    refreshed incrementally (sources it already holds are not scraped again).
+    refresh=True skips the as-is reuse.
     """
     print(f"\n🕵️ Deep Researcher Agent starting for: '{topic}'")
     
+    store = research_store.get_store()
+    previous = store.find(topic, reference_url) if store else None
+    if previous and previous['exact'] and not refresh and previous['age'] < research_store.FRESH_AGE:
+        print(f"  📚 Reusing saved research for '{previous['topic']}' ({previous['age'] / 3600:.1f}h old)")
+        return previous['context'], previous['keywords'], previous['sources']
+    known = {doc['href']: doc['text'] for doc in previous['documents']} if previous else {}
+    if known:
+        print(f"  📚 Refreshing saved research ({len(known)} known sources will not be re-scraped)")
+    
+    def scrape_known(url):
+        return known[url] if url in known else scrape_content(url)
+    
+    # Drops syndicated / mirrored copies: by title before fetching, by text after
+    deduper = dedup.Deduper(token_counter=llm_client.count_tokens)
+    
     context_data = []
+    documents = [] # (label, content) of every scraped source, for context packing
+    stored_documents = [] # Per-source text saved with the run
     sources = []
 
-    # --- Phase 1: User Intent (The "Demand") ---
-    print("\n--- Phase 1: Analyzing User Intent ---")
-    suggestions = get_google_suggestions(topic)
+    # --- Phase 1 & 2 run concurrently: neither needs the other's output ---
+    print("\n--- Phase 1: Analyzing User Intent | Phase 2: Analyzing Competitor Content ---")
+    
+    def fetch_unique(results):
+        """
+        Fetches search results, skipping same-story copies by title. A skipped
+        copy is fetched only if its original came back empty (403, paywall...).
+        Returns (result, content) pairs.
+        """
+        originals, copies = [], {}
+        for res in results:
+            duplicate_of = deduper.seen_title(res.get('title', ''))
+            if duplicate_of:
+                print(f"  🧹 Skipping {res['href']} (same story as '{duplicate_of}')")
+                copies.setdefault(duplicate_of, []).append(res)
+            else:
+                originals.append(res)
+        fetched = list(zip(originals, fetcher.fetch_all([res['href'] for res in originals], scrape_known)))
+        
+        stand_ins = []
+        for res, content in fetched:
+            if content:
+                continue
+            deduper.forget_title(res.get('title', ''))
+            for copy in copies.get(res.get('title', ''), [])[:1]:
+                print(f"  ↩️ {res['href']} came back empty; fetching {copy['href']} instead")
+                deduper.readmit(copy.get('title', ''))
+                stand_ins.append(copy)
+        if stand_ins:
+            fetched += list(zip(stand_ins, fetcher.fetch_all([res['href'] for res in stand_ins], scrape_known)))
+        return fetched
+    
+    def scrape_results(results):
+        # Reference URL is scraped by its own task
+        return fetch_unique([res for res in results if not (reference_url and res['href'] == reference_url)])
+    
+    graph = task_runner.TaskGraph()
+    # Phase 1: User Intent (The "Demand")
+    graph.add("intent", get_google_suggestions, args=(topic,), default=[])
+    # Phase 2: Competitor Content (The "Supply") - Broad Search, then scrape
+    graph.add("search", search_web, args=(f"{topic} news facts 2025",), default=[])
+    graph.add("scrape", scrape_results, deps=["search"], default=[])
+    # Reference URL (If provided) is fetched alongside the search
+    if reference_url:
+        print(f"  ⬇️ Scraping Reference URL: {reference_url}...")
+        graph.add("reference", scrape_known, args=(reference_url,), default="")
+    
+    results = graph.run(deadline=RESEARCH_DEADLINE)
+    print("  ⏱️ Task timings: " + ", ".join(f"{name}={secs:.1f}s" for name, secs in graph.timings.items()))
+    
+    suggestions = results["intent"]
     if suggestions:
         suggestions_str = ", ".join(suggestions)
         context_data.append(f"REAL-TIME USER SEARCHES (Google Autocomplete): {suggestions_str}\n")
         print(f"  ✅ Found {len(suggestions)} high-intent queries: {suggestions[:3]}...")
     else:
         context_data.append(f"REAL-TIME USER SEARCHES: {topic} (Base query)\n")
-
-    # --- Phase 2: Competitor Content (The "Supply") ---
-    print("\n--- Phase 2: Analyzing Competitor Content ---")
     
-    # Reference URL (If provided)
-    if reference_url:
-        print(f"  ⬇️ Scraping Reference URL: {reference_url}...")
-        ref_content = scrape_content(reference_url)
-        if ref_content:
-            context_data.append(f"PRIMARY REFERENCE (User Provided): {reference_url}\nCONTENT: {ref_content}\n")
-            sources.append({'title': 'User Reference', 'href': reference_url})
-
-    # Broad Search
-    initial_results = search_web(f"{topic} news facts 2025", max_results=3)
+    # Assemble in a fixed order: reference first, then search results
+    fetched = []
+    if results.get("reference"):
+        fetched.append(("PRIMARY REFERENCE (User Provided)", reference_url, 'User Reference', reference_url, results["reference"]))
+    for res, content in results["scrape"]:
+        fetched.append(("COMPETITOR CONTENT", res['title'], res.get('title', 'Source'), res['href'], content))
     
-    for res in initial_results:
-        if reference_url and res['href'] == reference_url: continue
-            
-        content = scrape_content(res['href'])
-        if content:
-            context_data.append(f"COMPETITOR CONTENT: {res['title']}\nCONTENT: {content}\n")
-            sources.append({'title': res.get('title', 'Source'), 'href': res['href']})
+    for label, heading, title, href, content in fetched:
+        if content and deduper.seen_text(href, content):
+            print(f"  🧹 Dropping {href} (near-duplicate text)")
+        elif content:
+            context_data.append(f"{label}: {heading}\nCONTENT: {content}\n")
+            documents.append((f"{label}: {heading}", content))
+            stored_documents.append({'label': label, 'title': title, 'href': href, 'text': content})
+            sources.append({'title': title, 'href': href})
             
-    initial_context = "\n".join(context_data)
+    # Pack the most relevant passages from ALL sources instead of whichever came first
+    initial_context = context_packer.pack(documents, [topic] + suggestions, max_tokens=750)
     
     # --- Phase 3: Gap Analysis & Reasoning ---
     print("\n--- Phase 3: Gap Analysis ---")
@@ -241,7 +284,7 @@ def deep_research(topic, api_key, reference_url=None):
     {suggestions}
     
     DATA SOURCE 2 (SUPPLY): Existing Competitor Content
-    {initial_context[:3000]}
+    {initial_context}
     
     TASK: Identify the "Content Gap". 
     1. What are users searching for (Source 1) that is NOT fully covered in the competitor content (Source 2)?
@@ -262,19 +305,33 @@ def deep_research(topic, api_key, reference_url=None):
     # --- Phase 4: Targeted Deep Dive ---
     if follow_up_queries:
         print("\n--- Phase 4: Targeted Deep Dive ---")
+        deep_results = []
         for query in follow_up_queries:
-            deep_results = search_web(query, max_results=1)
-            for res in deep_results:
-                if not any(s['href'] == res['href'] for s in sources):
-                    content = scrape_content(res['href'])
-                    if content:
-                        context_data.append(f"DEEP DIVE SOURCE: {res['title']}\nCONTENT: {content}\n")
-                        sources.append({'title': res.get('title', 'Source'), 'href': res['href']})
+            for res in search_web(query, max_results=1):
+                if any(s['href'] == res['href'] for s in sources + deep_results):
+                    continue
+                deep_results.append(res)
+        
+        for res, content in fetch_unique(deep_results):
+            if content and deduper.seen_text(res['href'], content):
+                print(f"  🧹 Dropping {res['href']} (near-duplicate text)")
+            elif content:
+                context_data.append(f"DEEP DIVE SOURCE: {res['title']}\nCONTENT: {content}\n")
+                documents.append((f"DEEP DIVE SOURCE: {res['title']}", content))
+                stored_documents.append({'label': "DEEP DIVE SOURCE", 'title': res.get('title', 'Source'), 'href': res['href'], 'text': content})
+                sources.append({'title': res.get('title', 'Source'), 'href': res['href']})
 
     full_context = "\n".join(context_data)
+    print(f"  🧹 Dedup: {deduper.summary()}")
     
     # Generate Keywords (Now with Intent Data)
-    keywords = generate_keywords(topic, full_context, api_key)
+    keywords = generate_keywords(topic, full_context, api_key, suggestions)
+    
+    if store and sources:
+        try:
+            store.save(topic, full_context, keywords, sources, stored_documents, reference_url)
+        except Exception as e:
+            print(f"  ⚠️ Could not save research: {e}")
     
     print("✅ Deep Research complete.")
     return full_context, keywords, sources
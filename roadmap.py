@@ -0,0 +1,216 @@
+import re
+import json
+
+# Appended to the Strategist prompt so the model emits a machine-readable copy of the hierarchy
+JSON_INSTRUCTION = """
+    *** STRUCTURED COPY (REQUIRED) ***
+    After the Markdown report, output the SAME hierarchy once more as JSON inside a ```json fenced block,
+    with exactly this shape (no comments, no trailing commas):
+    {"pillars": [{"name": "...", "why": "...", "topics": [
+        {"title": "...", "keyword": "...", "intent": "...", "angle": "...", "opportunity": true}
+    ]}]}
+    "opportunity" is true for topics you marked [OPPORTUNITY], false otherwise.
+    """
+
+_JSON_BLOCK_RE = re.compile(r"```json\s*(\{.*?\})\s*```", re.DOTALL)
+_PILLAR_RE = re.compile(r"^###\s+(?!#).*?pillar[^:]*:\s*(.+)$", re.IGNORECASE)
+_TOPIC_RE = re.compile(r"^####\s+(.+)$")
+_SECTION_RE = re.compile(r"^#{1,3}\s")
+_FIELD_RE = re.compile(r"^[*-]\s+\*\*(target keyword|user intent|content angle):\*\*\s*(.+)$", re.IGNORECASE)
+_WHY_RE = re.compile(r"^\*why this pillar\?\*\s*(.+)$", re.IGNORECASE)
+_NUMBER_RE = re.compile(r"^\d+[.)]\s*")
+
+class Topic:
+    __slots__ = ("id", "title", "keyword", "intent", "angle", "opportunity")
+
+    def __init__(self, id, title, keyword="", intent="", angle="", opportunity=False):
+        self.id = id
+        self.title = title
+        self.keyword = keyword
+        self.intent = intent
+        self.angle = angle
+        self.opportunity = opportunity
+
+class Pillar:
+    __slots__ = ("id", "name", "why", "topics")
+
+    def __init__(self, id, name, why="", topics=None):
+        self.id = id
+        self.name = name
+        self.why = why
+        self.topics = topics or []
+
+class Roadmap:
+    """
+    Parsed Strategist output.
+
+    `markdown` is the human-readable report (structured JSON block removed);
+    `pillars` is the typed hierarchy that the graph and exports are built from.
+    `source` records where the hierarchy came from: "json" or "markdown" (fallback).
+    Node IDs are positional ("P1", "P1_T2"), so repeated titles never collide.
+    """
+    def __init__(self, niche, markdown, pillars, source):
+        self.niche = niche
+        self.markdown = markdown
+        self.pillars = pillars
+        self.source = source
+
+    @property
+    def topic_count(self):
+        return sum(len(p.topics) for p in self.pillars)
+
+    def opportunities(self):
+        return [t for p in self.pillars for t in p.topics if t.opportunity]
+
+    def to_dict(self):
+        return {
+            "niche": self.niche,
+            "pillars": [{
+                "name": p.name, "why": p.why,
+                "topics": [{
+                    "title": t.title, "keyword": t.keyword, "intent": t.intent,
+                    "angle": t.angle, "opportunity": t.opportunity
+                } for t in p.topics]
+            } for p in self.pillars]
+        }
+
+    def to_markdown(self):
+        """Renders the hierarchy as Markdown (for exports)."""
+        lines = [f"# Content Roadmap: {self.niche}", ""]
+        for i, pillar in enumerate(self.pillars, 1):
+            lines.append(f"## Pillar {i}: {pillar.name}")
+            if pillar.why:
+                lines.append(pillar.why)
+            for j, topic in enumerate(pillar.topics, 1):
+                tag = "[OPPORTUNITY] " if topic.opportunity else ""
+                lines.append(f"### {j}. {tag}{topic.title}")
+                for label, value in (("Target Keyword", topic.keyword), ("User Intent", topic.intent), ("Content Angle", topic.angle)):
+                    if value:
+                        lines.append(f"- {label}: {value}")
+            lines.append("")
+        return "\n".join(lines)
+
+    def to_docx_markdown(self):
+        """
+        Renders the full report for the Word export. Prose outside the topics
+        (landscape analysis, why each pillar, execution plan) is kept as
+        written; each pillar's topics are rendered from the typed hierarchy.
+        """
+        if not self.pillars:
+            return self.markdown
+        lines = []
+        remaining = list(self.pillars)
+        pillar = None
+        in_topics = False
+        for line in self.markdown.splitlines():
+            stripped = line.strip()
+            is_pillar = bool(_PILLAR_RE.match(stripped)) and bool(remaining)
+            if pillar and (is_pillar or _SECTION_RE.match(stripped)):
+                # The next pillar, or a heading above topic level, closes the section
+                lines += _topic_lines(pillar)
+                pillar = None
+            if is_pillar:
+                pillar = remaining.pop(0)
+                in_topics = False
+            elif pillar and _TOPIC_RE.match(stripped):
+                in_topics = True
+            if not in_topics or not pillar:
+                lines.append(line)
+        if pillar:
+            lines += _topic_lines(pillar)
+        # Pillars the report has no heading for still make it into the export
+        for pillar in remaining:
+            lines += ["", f"### Pillar: {pillar.name}"] + ([pillar.why] if pillar.why else []) + _topic_lines(pillar)
+        return "\n".join(lines)
+
+def _topic_lines(pillar):
+    lines = []
+    for j, topic in enumerate(pillar.topics, 1):
+        tag = "[OPPORTUNITY] " if topic.opportunity else ""
+        lines.append(f"#### {j}. {tag}{topic.title}")
+        for label, value in (("Target Keyword", topic.keyword), ("User Intent", topic.intent), ("Content Angle", topic.angle)):
+            if value:
+                lines.append(f"- {label}: {value}")
+    lines.append("")
+    return lines
+
+def _text(value):
+    return " ".join(str(value).split()) if value is not None else ""
+
+def _clean_title(raw):
+    opportunity = "[OPPORTUNITY]" in raw.upper()
+    title = re.sub(r"\[opportunity\]", "", raw, flags=re.IGNORECASE)
+    title = _NUMBER_RE.sub("", title.strip()).strip(" *_")
+    return title, opportunity
+
+def _from_json(data):
+    """Validates the structured block into Pillars. Invalid entries are dropped."""
+    pillars = []
+    raw_pillars = data.get("pillars") if isinstance(data, dict) else None
+    if not isinstance(raw_pillars, list):
+        return []
+    for raw_pillar in raw_pillars:
+        if not isinstance(raw_pillar, dict) or not _text(raw_pillar.get("name")):
+            continue
+        pillar = Pillar(f"P{len(pillars) + 1}", _text(raw_pillar["name"]), _text(raw_pillar.get("why")))
+        for raw_topic in raw_pillar.get("topics") or []:
+            if not isinstance(raw_topic, dict) or not _text(raw_topic.get("title")):
+                continue
+            title, tagged = _clean_title(_text(raw_topic["title"]))
+            pillar.topics.append(Topic(
+                f"{pillar.id}_T{len(pillar.topics) + 1}", title,
+                _text(raw_topic.get("keyword")), _text(raw_topic.get("intent")), _text(raw_topic.get("angle")),
+                bool(raw_topic.get("opportunity")) or tagged
+            ))
+        pillars.append(pillar)
+    return pillars
+
+def _from_markdown(text):
+    """Fallback: one pass over the report's '### Pillar' / '####' headings."""
+    pillars = []
+    pillar = topic = None
+    for line in text.splitlines():
+        line = line.strip()
+        match = _PILLAR_RE.match(line)
+        if match:
+            pillar = Pillar(f"P{len(pillars) + 1}", match.group(1).strip(" *_"))
+            pillars.append(pillar)
+            topic = None
+            continue
+        if pillar is None:
+            continue
+        match = _TOPIC_RE.match(line)
+        if match:
+            title, opportunity = _clean_title(match.group(1))
+            topic = Topic(f"{pillar.id}_T{len(pillar.topics) + 1}", title, opportunity=opportunity)
+            pillar.topics.append(topic)
+            continue
+        match = _WHY_RE.match(line)
+        if match and topic is None:
+            pillar.why = match.group(1).strip()
+            continue
+        match = _FIELD_RE.match(line)
+        if match and topic is not None:
+            field = {"target keyword": "keyword", "user intent": "intent", "content angle": "angle"}[match.group(1).lower()]
+            setattr(topic, field, match.group(2).strip())
+    return pillars
+
+def parse(text, niche=""):
+    """
+    Parses Strategist output into a Roadmap.
+    Prefers the ```json block; falls back to the Markdown headings if it is missing or invalid.
+    """
+    text = text or ""
+    matches = list(_JSON_BLOCK_RE.finditer(text))
+    pillars = []
+    markdown = text
+    if matches:
+        block = matches[-1]
+        markdown = (text[:block.start()] + text[block.end():]).strip()
+        try:
+            pillars = _from_json(json.loads(block.group(1)))
+        except ValueError:
+            pillars = []
+    if pillars:
+        return Roadmap(niche, markdown, pillars, "json")
+    return Roadmap(niche, markdown, _from_markdown(markdown), "markdown")
@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import sqlite3
+import copy
+import hashlib
+import functools
+import threading
+import concurrent.futures
+
+# Cache settings (overridable via environment)
+CACHE_ENABLED = os.getenv("STRATOS_SEARCH_CACHE", "1") != "0"
+CACHE_DIR = os.getenv("STRATOS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".stratos_cache"))
+
+# Per-source (fresh for, served stale for up to) in seconds.
+# Within the stale window the old answer is returned at once and refreshed in the background.
+SOURCE_TTLS = {
+    "ddg_news":     (15 * 60,     60 * 60),            # Breaking news goes stale fast
+    "google_news":  (30 * 60,     2 * 3600),
+    "ddg_text":     (6 * 3600,    2 * 24 * 3600),
+    "autocomplete": (6 * 3600,    2 * 24 * 3600),
+    "competitors":  (24 * 3600,   7 * 24 * 3600),
+}
+DEFAULT_TTL = (3600, 4 * 3600)
+
+class SearchCache:
+    """
+    Shared cache for search / discovery queries, backed by SQLite.
+
+    - Fresh entries are served directly.
+    - Stale entries (past their TTL but inside the stale window) are served
+      immediately while one background refresh runs (stale-while-revalidate).
+    - Concurrent misses for the same query share a single in-flight call.
+    - Empty results are never stored, so a failed or rate-limited search
+      does not poison the cache (and never replaces a good stale answer).
+    """
+    def __init__(self, path, ttls=SOURCE_TTLS):
+        self.path = path
+        self.ttls = ttls
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._inflight = {}   # key -> Future
+        self._refresher = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="search-refresh")
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_created ON results(created)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    @staticmethod
+    def make_key(source, args):
+        payload = json.dumps([source, args], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _read(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT payload, created FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None, None
+        return json.loads(row[0]), row[1]
+
+    def _write(self, key, source, query, value):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, source, query, payload, created) VALUES (?, ?, ?, ?, ?)",
+                (key, source, query, json.dumps(value, ensure_ascii=False, default=str), now)
+            )
+            # Drop anything past the longest stale window
+            longest = max(stale for _, stale in list(self.ttls.values()) + [DEFAULT_TTL])
+            conn.execute("DELETE FROM results WHERE created < ?", (now - longest,))
+
+    def _call(self, key, source, query, fetch_fn):
+        """Runs fetch_fn once per key at a time; other callers wait for the same result."""
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = concurrent.futures.Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced += 1
+        if not owner:
+            # Callers may mutate result dicts, so each waiter gets its own copy
+            return copy.deepcopy(future.result())
+
+        try:
+            value = fetch_fn()
+            if value:
+                self._write(key, source, query, value)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def get_or_fetch(self, source, query, args, fetch_fn):
+        """
+        Returns the cached answer for (source, args), fetching it if needed.
+
+        Args:
+            source (str): Key into SOURCE_TTLS.
+            query (str): Human-readable query (stored for inspection).
+            args: JSON-serialisable call arguments that identify the query.
+            fetch_fn (callable): Performs the real search; returns a list/dict.
+        """
+        key = self.make_key(source, args)
+        ttl, stale_window = self.ttls.get(source, DEFAULT_TTL)
+        value, created = self._read(key)
+        age = time.time() - created if created is not None else None
+
+        if age is not None and age < ttl:
+            self.hits += 1
+            return value
+
+        if age is not None and age < stale_window:
+            self.stale_hits += 1
+            with self._lock:
+                refreshing = key in self._inflight
+            if not refreshing:
+                self._refresher.submit(self._refresh, key, source, query, fetch_fn)
+            return value
+
+        self.misses += 1
+        return self._call(key, source, query, fetch_fn)
+
+    def _refresh(self, key, source, query, fetch_fn):
+        try:
+            self._call(key, source, query, fetch_fn)
+        except Exception as e:
+            print(f"  ⚠️ Background refresh failed ({source}: {query}): {e}")
+
+    def clear(self, source=None):
+        with self._connect() as conn:
+            if source:
+                conn.execute("DELETE FROM results WHERE source = ?", (source,))
+            else:
+                conn.execute("DELETE FROM results")
+
+    def stats(self):
+        """Returns counters for this process plus current store size."""
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Returns the process-wide search cache, or None if caching is disabled."""
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SearchCache(os.path.join(CACHE_DIR, "search_cache.sqlite"))
+    return _cache
+
+def cached(source):
+    """
+    Decorator: caches a search function's results under `source`.
+    The first positional argument is treated as the query; queries are
+    normalised (case / whitespace) so "Solar  Panels" and "solar panels" share an entry.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(query, *args, **kwargs):
+            cache = get_cache()
+            if cache is None:
+                return fn(query, *args, **kwargs)
+            normalized = " ".join(str(query).lower().split())
+            return cache.get_or_fetch(
+                source, normalized, [normalized, args, kwargs],
+                lambda: fn(query, *args, **kwargs)
+            )
+        return wrapper
+    return decorator
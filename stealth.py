@@ -0,0 +1,53 @@
+import random
+import itertools
+import threading
+
+# Size of the rotating pool of header sets
+POOL_SIZE = 24
+
+FALLBACK_USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.1 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:89.0) Gecko/20100101 Firefox/89.0',
+]
+
+ACCEPT_LANGUAGES = ['en-US,en;q=0.5', 'en-US,en;q=0.9', 'en-GB,en;q=0.8,en-US;q=0.6']
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _load_user_agents():
+    """Loads the fake_useragent dataset once and samples a set of UAs from it."""
+    try:
+        from fake_useragent import UserAgent
+        ua = UserAgent()
+        return list({ua.random for _ in range(POOL_SIZE)})
+    except Exception:
+        return list(FALLBACK_USER_AGENTS)
+
+def _build_pool():
+    header_sets = []
+    for user_agent in _load_user_agents():
+        header_sets.append({
+            'User-Agent': user_agent,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': random.choice(ACCEPT_LANGUAGES),
+            'Referer': 'https://www.google.com/',
+            'DNT': '1',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+        })
+    random.shuffle(header_sets)
+    return itertools.cycle(header_sets)
+
+def get_headers():
+    """
+    Returns realistic browser headers, rotating through a pool built on first use.
+    The UA dataset is loaded lazily, once per process; each call after that is O(1).
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _build_pool()
+    return dict(next(_pool))
@@ -1,44 +1,40 @@
-import requests
 from bs4 import BeautifulSoup
 from duckduckgo_search import DDGS
 import llm_client
+import fetcher
+import stealth
+import task_runner
+import search_cache
+import roadmap
 import os
-from fake_useragent import UserAgent
+
+# Seconds allowed for the whole pre-LLM gathering phase
+ROADMAP_DEADLINE = 45
 
 def get_stealth_headers():
-    try:
-        ua = UserAgent()
-        return {'User-Agent': ua.random, 'Referer': 'https://www.google.com/'}
-    except:
-        return {'User-Agent': 'Mozilla/5.0'}
+    return stealth.get_headers()
 
-def crawl_site(url):
-    """
-    Scrapes the homepage and extracts main headings/meta description 
-    to understand what the site is about.
-    """
-    try:
-        response = requests.get(url, headers=get_stealth_headers(), timeout=15)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+def summarize_site(url, html):
+    """Extracts title, meta description, headings and nav links from a homepage."""
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    title = soup.title.string if soup.title else "No Title"
+    meta_desc = ""
+    meta_tag = soup.find('meta', attrs={'name': 'description'})
+    if meta_tag:
+        meta_desc = meta_tag.get('content')
         
-        title = soup.title.string if soup.title else "No Title"
-        meta_desc = ""
-        meta_tag = soup.find('meta', attrs={'name': 'description'})
-        if meta_tag:
-            meta_desc = meta_tag.get('content')
+    h1s = [h.get_text(strip=True) for h in soup.find_all('h1')]
+    h2s = [h.get_text(strip=True) for h in soup.find_all('h2')[:5]] # Top 5 H2s
+    
+    # Try to find nav links to understand structure
+    nav_links = []
+    nav = soup.find('nav')
+    if nav:
+        for link in nav.find_all('a')[:10]:
+            nav_links.append(link.get_text(strip=True))
             
-        h1s = [h.get_text(strip=True) for h in soup.find_all('h1')]
-        h2s = [h.get_text(strip=True) for h in soup.find_all('h2')[:5]] # Top 5 H2s
-        
-        # Try to find nav links to understand structure
-        nav_links = []
-        nav = soup.find('nav')
-        if nav:
-            for link in nav.find_all('a')[:10]:
-                nav_links.append(link.get_text(strip=True))
-                
-        return f"""
+    return f"""
         URL: {url}
         Title: {title}
         Description: {meta_desc}
@@ -46,9 +42,22 @@ def crawl_site(url):
         Sub Headings: {h2s}
         Navigation/Categories: {nav_links}
         """
+
+def crawl_site(url):
+    """
+    Scrapes the homepage and extracts main headings/meta description 
+    to understand what the site is about.
+    """
+    try:
+        # Served from the page cache when possible (skips parsing on repeat hits)
+        return fetcher.fetch_extract(
+            url, "site_summary", lambda html: summarize_site(url, html),
+            headers=get_stealth_headers(), timeout=15, polite=False
+        )
     except Exception as e:
         return f"Error crawling {url}: {e}"
 
+@search_cache.cached("competitors")
 def find_competitors(niche):
     """
     Uses DuckDuckGo to find top ranking sites for the niche.
@@ -69,10 +78,18 @@ def find_competitors(niche):
     
     return competitors
 
-def generate_roadmap(niche, user_url, manual_competitors, api_key, strategy_depth="Pro (Balanced)"):
+def generate_roadmap(niche, user_url, manual_competitors, api_key, strategy_depth="Pro (Balanced)", progress=None, on_text=None):
     """
     Orchestrates the strategy generation.
+    Returns the raw model output (Markdown report + ```json hierarchy); parse it with roadmap.parse().
+    progress: optional callback(message) for per-step status updates (e.g. a Streamlit container).
+    on_text: optional callback(chunk) receiving the roadmap as it streams.
     """
+    def report(message):
+        print(message)
+        if progress:
+            progress(message)
+
     # genai.configure(api_key=api_key) - Handled by llm_client
     
     # Map Depth to Instructions
@@ -86,34 +103,55 @@ def generate_roadmap(niche, user_url, manual_competitors, api_key, strategy_dept
         structure_instruction = "Generate exactly 5 Pillars. Under each, list 5 Topics. (Total ~30 nodes)."
         focus_instruction = "Balance VIRALITY (Reach) with AUTHORITY (Depth). Ensure a mix of traffic-driving and trust-building content."
 
-    # 1. Analyze User Site (if provided)
-    user_context = "User has no existing site."
-    if user_url:
-        print(f"  🏠 Analyzing your site: {user_url}...")
-        user_context = crawl_site(user_url)
-        
-    # 2. Analyze Competitors
-    competitor_urls = manual_competitors if manual_competitors else []
-    
-    # Auto-discover if we don't have enough manual ones (aim for 3 total)
-    if len(competitor_urls) < 3:
-        auto_competitors = find_competitors(niche)
-        # Add unique ones
-        for url in auto_competitors:
-            if url not in competitor_urls:
-                competitor_urls.append(url)
-                
-    competitor_context = ""
-    print(f"  ⚔️  Analyzing competitors: {competitor_urls}...")
-    for url in competitor_urls[:3]: # Limit to 3 to save time/tokens
-        print(f"     ⬇️ Crawling {url}...")
-        data = crawl_site(url)
-        competitor_context += f"\n--- COMPETITOR: {url} ---\n{data}\n"
-
-    # 3. Analyze User Intent (Autocomplete) - NEW
-    print(f"  🔮 Analyzing User Intent for '{niche}'...")
+    # 1-3. Gather inputs. None of these depend on each other until the prompt
+    # is assembled, so they run as a task graph (pre-LLM time = slowest task).
     import researcher # Import here to avoid circular dependency at top level if any
-    suggestions = researcher.get_google_suggestions(niche)
+    
+    manual_urls = list(manual_competitors or [])[:3]
+    graph = task_runner.TaskGraph()
+    
+    def crawl_competitors(urls):
+        # Crawl in parallel; proceed with whatever finished by the deadline
+        def on_crawled(i, url, data):
+            failed = not data or data.startswith("Error crawling")
+            graph.report(f"     {'❌' if failed else '✅'} Crawled {url}")
+        return list(zip(urls, fetcher.fetch_all(urls, crawl_site, on_result=on_crawled)))
+    
+    def discover_competitors():
+        # Auto-discover if we don't have enough manual ones (aim for 3 total)
+        if len(manual_urls) >= 3:
+            return []
+        found = [url for url in find_competitors(niche) if url not in manual_urls]
+        return found[:3 - len(manual_urls)]
+    
+    def analyze_user_site():
+        if not user_url:
+            return "User has no existing site."
+        graph.report(f"  🏠 Analyzing your site: {user_url}...")
+        return crawl_site(user_url)
+    
+    def analyze_intent():
+        graph.report(f"  🔮 Analyzing User Intent for '{niche}'...")
+        return researcher.get_google_suggestions(niche)
+    
+    graph.add("user_site", analyze_user_site, default="User has no existing site.")
+    graph.add("manual_competitors", crawl_competitors, args=(manual_urls,), default=[])
+    graph.add("discover_competitors", discover_competitors, default=[])
+    graph.add("auto_competitors", crawl_competitors, deps=["discover_competitors"], default=[])
+    graph.add("intent", analyze_intent, default=[])
+    
+    report(f"  ⚔️  Analyzing competitors and user intent for '{niche}'...")
+    results = graph.run(deadline=ROADMAP_DEADLINE, on_message=report)
+    print("  ⏱️ Task timings: " + ", ".join(f"{name}={secs:.1f}s" for name, secs in graph.timings.items()))
+    
+    user_context = results["user_site"]
+    
+    competitor_context = ""
+    for url, data in results["manual_competitors"] + results["auto_competitors"]:
+        if data:
+            competitor_context += f"\n--- COMPETITOR: {url} ---\n{data}\n"
+    
+    suggestions = results["intent"]
     suggestions_str = ", ".join(suggestions) if suggestions else "No specific autocomplete data found."
         
     # 4. Generate Strategy
@@ -150,33 +188,19 @@ def generate_roadmap(niche, user_url, manual_competitors, api_key, strategy_dept
     - For HIGH DEMAND / UNTAPPED OPPORTUNITIES (based on User Intent): "#### [OPPORTUNITY] Topic Name"
     
     Ensure at least 30% of the topics are marked as [OPPORTUNITY] if the data supports it.
-    """
+    """ + roadmap.JSON_INSTRUCTION
 
     # Use OpenRouter via llm_client
-    # Primary: Llama 3.1 70B (Smart)
-    # Fallback: Llama 3.1 8B (Fast)
-    candidate_models = [
-        "meta-llama/llama-3.1-70b-instruct",
-        "meta-llama/llama-3.1-8b-instruct"
-    ]
-
-    response = None
-    for model_name in candidate_models:
-        try:
-            print(f"   Trying model: {model_name}...")
-            # llm_client.generate returns a generator if stream=True
-            response = llm_client.generate(
-                prompt=user_message,
-                system_instruction=system_instruction,
-                model=model_name,
-                stream=True
-            )
-            break # Success
-        except Exception as e:
-            print(f"   ❌ Failed with {model_name}: {e}")
-            continue
-            
-    if not response:
+    # Primary: Llama 3.1 70B (Smart), hedged onto Llama 3.1 8B (Fast)
+    try:
+        response = llm_client.SMART_FALLBACK.generate(
+            prompt=user_message,
+            system_instruction=system_instruction,
+            stream=True,
+            api_key=api_key
+        )
+    except Exception as e:
+        print(f"   ❌ All models failed: {e}")
         return "Error: All models failed to generate the roadmap."
     
     print("\n" + "="*30)
@@ -187,5 +211,15 @@ def generate_roadmap(niche, user_url, manual_competitors, api_key, strategy_dept
     for chunk in response:
         print(chunk.text, end="", flush=True)
         full_text += chunk.text
+        if on_text:
+            on_text(chunk.text)
         
     return full_text
+
+def roadmap_job(niche, user_url, manual_competitors, strategy_depth, api_key=None, job=None):
+    """generate_roadmap() as a background job (see job_queue): progress and streamed text go to the job handle."""
+    return generate_roadmap(
+        niche, user_url, manual_competitors, api_key, strategy_depth,
+        progress=job.report if job else None,
+        on_text=job.write if job else None
+    )
@@ -0,0 +1,133 @@
+import time
+import queue
+import concurrent.futures
+
+class _Task:
+    def __init__(self, name, fn, deps, default):
+        self.name = name
+        self.fn = fn
+        self.deps = deps
+        self.default = default
+
+class TaskGraph:
+    """
+    Runs a small graph of dependent tasks concurrently.
+
+    Each task starts as soon as all of its dependencies have finished, and
+    receives their results as positional arguments (in `deps` order).
+    A task whose dependency failed is skipped. Failed, skipped and
+    deadline-dropped tasks resolve to their `default` value.
+
+    Usage:
+        graph = TaskGraph()
+        graph.add("search", search_web, args=(query,), default=[])
+        graph.add("scrape", scrape_results, deps=["search"], default=[])
+        results = graph.run(deadline=60)
+        results["scrape"], graph.timings["scrape"]
+
+    Tasks may call graph.report(message) from any thread; messages are
+    delivered to run()'s on_message callback on the caller's thread, so it
+    is safe to update Streamlit from there.
+    """
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self.tasks = {}
+        self.timings = {}     # name -> seconds
+        self.errors = {}      # name -> exception / reason
+        self._messages = queue.Queue()
+
+    def add(self, name, fn, deps=(), args=(), default=None):
+        """Registers a task. `args` are passed before the dependency results."""
+        if name in self.tasks:
+            raise ValueError(f"Duplicate task: {name}")
+        for dep in deps:
+            if dep not in self.tasks:
+                raise ValueError(f"Task '{name}' depends on unknown task '{dep}'")
+        if args:
+            fn = (lambda f, a: lambda *dep_results: f(*a, *dep_results))(fn, tuple(args))
+        self.tasks[name] = _Task(name, fn, list(deps), default)
+        return self
+
+    def report(self, message):
+        self._messages.put(message)
+
+    def _timed(self, task, dep_results):
+        started = time.time()
+        try:
+            return task.fn(*dep_results)
+        finally:
+            self.timings[task.name] = time.time() - started
+
+    def run(self, deadline=None, on_message=None):
+        """
+        Executes the graph. Returns a dict of task name -> result.
+
+        Args:
+            deadline (float): Seconds for the whole graph; unfinished tasks get their default.
+            on_message (callable): Receives report() messages and per-task completion notes.
+        """
+        results = {}
+        waiting = dict(self.tasks)
+        running = {}
+        end = time.time() + deadline if deadline else None
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+
+        def drain():
+            while True:
+                try:
+                    message = self._messages.get_nowait()
+                except queue.Empty:
+                    return
+                if on_message:
+                    on_message(message)
+
+        try:
+            while waiting or running:
+                # Start (or skip) every task whose dependencies are resolved
+                for name, task in list(waiting.items()):
+                    if any(dep in waiting or dep in running.values() for dep in task.deps):
+                        continue
+                    del waiting[name]
+                    failed_deps = [dep for dep in task.deps if dep in self.errors]
+                    if failed_deps:
+                        self.errors[name] = f"skipped: dependency failed ({', '.join(failed_deps)})"
+                        results[name] = task.default
+                        continue
+                    future = executor.submit(self._timed, task, [results[dep] for dep in task.deps])
+                    running[future] = name
+
+                if not running:
+                    continue
+
+                timeout = 0.1
+                if end is not None:
+                    timeout = min(timeout, max(0.0, end - time.time()))
+                done, _ = concurrent.futures.wait(list(running), timeout=timeout,
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                drain()
+
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                        self.report(f"✅ {name} ({self.timings.get(name, 0):.1f}s)")
+                    except Exception as e:
+                        self.errors[name] = e
+                        results[name] = self.tasks[name].default
+                        self.report(f"❌ {name} failed: {e}")
+
+                if end is not None and time.time() >= end and running:
+                    for future, name in running.items():
+                        self.errors[name] = "deadline exceeded"
+                        results[name] = self.tasks[name].default
+                        self.report(f"⏱️ {name} dropped (deadline)")
+                    running.clear()
+                    for name, task in waiting.items():
+                        self.errors[name] = "deadline exceeded"
+                        results[name] = task.default
+                    waiting.clear()
+            drain()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return results
@@ -0,0 +1,21 @@
+from dedup import Deduper
+
+def test_number_titles_are_not_the_same_story():
+    deduper = Deduper()
+    assert deduper.seen_title("iPhone 15 review - The Verge") is None
+    assert deduper.seen_title("iPhone 16 review - CNET") is None
+
+def test_syndicated_title_is_the_same_story():
+    deduper = Deduper()
+    assert deduper.seen_title("Fed raises rates by a quarter point - Reuters") is None
+    assert deduper.seen_title("Fed raises rates by a quarter point | The Guardian") == "Fed raises rates by a quarter point - Reuters"
+    assert deduper.skipped_fetches == 1
+
+def test_copy_stands_in_for_a_failed_original():
+    deduper = Deduper()
+    deduper.seen_title("Fed raises rates - Reuters")
+    deduper.seen_title("Fed raises rates - AP")
+    deduper.forget_title("Fed raises rates - Reuters")
+    deduper.readmit("Fed raises rates - AP")
+    assert deduper.skipped_fetches == 0
+    assert deduper.seen_title("Fed raises rates - BBC") == "Fed raises rates - AP"
@@ -0,0 +1,58 @@
+import pytest
+import extractor
+
+BACKENDS = ["lxml", "html.parser"]
+
+PAGE = b"""<html><head><title>Solar</title><script>var x = 1;</script></head>
+<body>
+<nav><a href="/">Home</a> <a href="/blog">Blog</a></nav>
+<p>Solar panels convert sunlight into electricity for homes and businesses.</p>
+<ul><li>item one</li><li>item two</li></ul>
+<table><tr><th>Qty</th><th>Item</th></tr><tr><td>42</td><td>Price</td></tr></table>
+<div>Share this</div>
+<footer>Copyright 2025</footer>
+</body></html>"""
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    if request.param == "lxml":
+        pytest.importorskip("lxml")
+    return request.param
+
+def test_text_mode_keeps_list_items_and_table_cells(backend):
+    text = extractor.extract(PAGE, mode="text", backend=backend)
+    assert "Solar panels convert sunlight" in text
+    assert "item one item two" in text
+    assert "Qty Item 42 Price" in text
+
+def test_markdown_mode_keeps_list_items_and_table_cells(backend):
+    lines = extractor.extract(PAGE, mode="markdown", backend=backend).splitlines()
+    assert "- item one" in lines
+    assert "- item two" in lines
+    for cell in ("Qty", "Item", "42", "Price"):
+        assert cell in lines
+
+def test_boilerplate_is_dropped(backend):
+    text = extractor.extract(PAGE, mode="text", backend=backend)
+    assert "var x" not in text          # <script>
+    assert "Blog" not in text           # <nav>
+    assert "Copyright" not in text      # <footer>
+    assert "Share this" not in text     # Short, unpunctuated block
+
+def test_link_dense_list_items_are_dropped(backend):
+    html = b"""<p>An article paragraph that is long enough to count as content.</p>
+<ul><li><a href="/a">Related story</a></li></ul>"""
+    text = extractor.extract(html, mode="text", backend=backend)
+    assert "Related story" not in text
+
+def test_budget_truncates_and_appends_suffix(backend):
+    html = b"<article>" + b"<p>A sentence about solar storage and grid economics.</p>" * 200 + b"</article>"
+    text = extractor.extract(html, budget=500, mode="text", backend=backend, suffix="...")
+    assert text.endswith("...")
+    assert len(text) == 503
+
+def test_streaming_feed_matches_one_shot_extract(backend):
+    streaming = extractor.StreamingExtractor(mode="text", backend=backend)
+    for i in range(0, len(PAGE), 7):
+        streaming.feed(PAGE[i:i + 7])
+    assert streaming.finish() == extractor.extract(PAGE, mode="text", backend=backend)
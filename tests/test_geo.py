@@ -0,0 +1,118 @@
+import json
+import time
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import geo
+
+class _StandIn(BaseHTTPRequestHandler):
+    """Answers like ipapi.co: /<ip>/json/ -> {"country_code": ...}."""
+    countries = {"102.89.0.1": "NG", "8.8.8.8": "US"}
+    slow = {"10.0.0.9"}
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        ip = self.path.strip("/").split("/")[0]
+        if ip in self.slow:
+            time.sleep(1.0)
+        if ip not in self.countries:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = json.dumps({"country_code": self.countries[ip]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture(scope="module")
+def service():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+@pytest.fixture(autouse=True)
+def geo_service(service, monkeypatch):
+    monkeypatch.setattr(geo, "GEO_SERVICE", service)
+    geo._ip_cache.clear()
+    _StandIn.requests.clear()
+    yield
+
+def _fake_streamlit(monkeypatch, headers=None, ip=None):
+    fake = types.SimpleNamespace(
+        session_state={},
+        context=types.SimpleNamespace(headers=headers or {}, ip_address=ip),
+    )
+    monkeypatch.setattr(geo, "st", fake)
+    return fake
+
+def _wait_for_country(fake, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline and not fake.session_state["_geo"]["country"]:
+        time.sleep(0.01)
+
+def test_lookup_returns_country_and_caches_it():
+    assert geo.lookup_country("102.89.0.1") == "NG"
+    assert geo.lookup_country("102.89.0.1") == "NG"
+    assert _StandIn.requests == ["/102.89.0.1/json/"]
+
+def test_lookup_failure_is_not_cached():
+    assert geo.lookup_country("192.0.2.1") is None
+    assert geo.lookup_country("192.0.2.1") is None
+    assert len(_StandIn.requests) == 2
+
+def test_lookup_times_out():
+    started = time.time()
+    assert geo.lookup_country("10.0.0.9", timeout=0.2) is None
+    assert time.time() - started < 5
+
+def test_lookup_without_ip_never_queries_the_service():
+    assert geo.lookup_country(None) is None
+    assert geo.lookup_country("") is None
+    assert _StandIn.requests == []
+
+def test_accept_language_region():
+    assert geo.country_from_accept_language("en-NG,en;q=0.9") == "NG"
+    assert geo.country_from_accept_language("fr;q=0.9, pt_BR") == "BR"
+    assert geo.country_from_accept_language("en") is None
+    assert geo.country_from_accept_language(None) is None
+
+def test_user_country_from_service(monkeypatch):
+    fake = _fake_streamlit(monkeypatch, headers={"Accept-Language": "en-GB"}, ip="102.89.0.1")
+    assert geo.get_user_country() == "GB"    # Fallback while the lookup runs
+    _wait_for_country(fake)
+    assert geo.get_user_country() == "NG"
+    assert _StandIn.requests == ["/102.89.0.1/json/"]
+
+def test_user_country_from_forwarded_header(monkeypatch):
+    fake = _fake_streamlit(monkeypatch, headers={"X-Forwarded-For": "8.8.8.8, 10.0.0.1"})
+    geo.get_user_country()
+    _wait_for_country(fake)
+    assert geo.get_user_country() == "US"
+    assert _StandIn.requests == ["/8.8.8.8/json/"]
+
+def test_user_country_without_ip_uses_accept_language(monkeypatch):
+    _fake_streamlit(monkeypatch, headers={"Accept-Language": "en-NG"})
+    assert geo.get_user_country() == "NG"
+    assert geo.get_user_country() == "NG"
+    assert _StandIn.requests == []
+
+def test_user_country_without_ip_or_region_uses_default(monkeypatch):
+    _fake_streamlit(monkeypatch, headers={"Accept-Language": "en"})
+    assert geo.get_user_country() == "US"
+    assert geo.get_user_country(default="GB") == "US"   # Settled once per session
+    assert _StandIn.requests == []
+
+def test_user_country_falls_back_when_service_fails(monkeypatch):
+    fake = _fake_streamlit(monkeypatch, headers={"Accept-Language": "en-KE"}, ip="192.0.2.1")
+    assert geo.get_user_country() == "KE"
+    _wait_for_country(fake)
+    assert geo.get_user_country() == "KE"
@@ -0,0 +1,42 @@
+import pytest
+import research_store
+
+@pytest.fixture
+def store(tmp_path):
+    return research_store.ResearchStore(str(tmp_path / "research.sqlite"))
+
+def _save(store, topic, reference_url=None):
+    store.save(topic, f"context about {topic}", f"{topic} keywords", [{"title": topic, "href": "https://example.com"}],
+               [{"label": "COMPETITOR CONTENT", "title": topic, "href": "https://example.com", "text": "text"}], reference_url)
+
+def test_exact_topic_is_found_as_exact(store):
+    _save(store, "AI tools")
+    record = store.find("  ai   TOOLS ")
+    assert record["topic"] == "AI tools"
+    assert record["exact"]
+
+def test_acronym_topics_are_not_confused(store):
+    _save(store, "AI tools")
+    assert store.find("VR tools") is None
+
+def test_number_topics_are_not_confused(store):
+    _save(store, "iPhone 15 review")
+    assert store.find("iPhone 16 review") is None
+    assert store.find("iPhone 15 review")["exact"]
+
+def test_near_identical_topic_is_found_but_not_exact(store):
+    _save(store, "best solar panels for homes in nigeria 2025")
+    record = store.find("best solar panels for homes nigeria 2025")
+    assert record is not None
+    assert not record["exact"]
+
+def test_reference_url_separates_records(store):
+    _save(store, "AI tools", reference_url="https://a.example")
+    assert store.find("AI tools") is None
+    assert store.find("AI tools", "https://a.example")["exact"]
+
+def test_search_matches_short_terms(store):
+    _save(store, "AI tools")
+    _save(store, "solar panels")
+    results = store.search("AI")
+    assert [r["topic"] for r in results] == ["AI tools"]
@@ -0,0 +1,51 @@
+import json
+import roadmap
+
+REPORT = """# Content Roadmap: Solar
+## Landscape Analysis
+Competitors cover installation but not financing.
+
+### Pillar 1: Financing
+*Why this pillar?* Nobody explains loans.
+#### 1. Solar loans [OPPORTUNITY]
+- **Target Keyword:** solar loan rates
+#### 2. Leasing
+- **Target Keyword:** solar lease
+
+### Pillar 2: Installation
+#### 1. DIY panels
+
+## Execution Plan
+Publish the financing pillar first.
+"""
+
+STRUCTURE = {"pillars": [
+    {"name": "Financing", "why": "Nobody explains loans.", "topics": [
+        {"title": "Solar loans", "keyword": "solar loan rates", "intent": "Commercial", "angle": "Rates compared", "opportunity": True},
+        {"title": "Leasing", "keyword": "solar lease", "intent": "Informational", "angle": "", "opportunity": False},
+    ]},
+    {"name": "Installation", "why": "", "topics": [
+        {"title": "DIY panels", "keyword": "diy solar", "intent": "Informational", "angle": "", "opportunity": False},
+    ]},
+]}
+
+def _parsed():
+    return roadmap.parse(REPORT + "\n```json\n" + json.dumps(STRUCTURE) + "\n```", "Solar")
+
+def test_docx_markdown_keeps_report_prose():
+    text = _parsed().to_docx_markdown()
+    assert "## Landscape Analysis" in text
+    assert "*Why this pillar?* Nobody explains loans." in text
+    assert "## Execution Plan\nPublish the financing pillar first." in text
+    assert "```json" not in text
+
+def test_docx_markdown_renders_topics_from_hierarchy():
+    text = _parsed().to_docx_markdown()
+    assert "#### 1. [OPPORTUNITY] Solar loans\n- Target Keyword: solar loan rates\n- User Intent: Commercial" in text
+    assert "- Target Keyword: diy solar" in text
+    assert text.count("Solar loans") == 1
+    assert text.index("### Pillar 2: Installation") < text.index("DIY panels") < text.index("## Execution Plan")
+
+def test_docx_markdown_without_structure_is_the_report():
+    parsed = roadmap.parse("# Notes\nNo pillars here.", "Solar")
+    assert parsed.to_docx_markdown() == parsed.markdown
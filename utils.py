@@ -1,6 +1,8 @@
 import streamlit as st
 import base64
 import io
+import time
+import job_queue
 from docx import Document
 from docx.shared import Pt
 
@@ -158,6 +160,8 @@ def create_docx(markdown_text):
             doc.add_heading(line.replace('## ', ''), level=2)
         elif line.startswith('### '):
             doc.add_heading(line.replace('### ', ''), level=3)
+        elif line.startswith('#### '):
+            doc.add_heading(line.replace('#### ', ''), level=4)
         elif line.startswith('- '):
             doc.add_paragraph(line.replace('- ', ''), style='List Bullet')
         else:
@@ -169,6 +173,137 @@ def create_docx(markdown_text):
     buffer.seek(0)
     return buffer
 
+class StreamRenderer:
+    """
+    Renders a streaming markdown response without re-sending the whole document per chunk.
+    
+    Chunks are buffered in a list and flushed to the UI at most `fps` times per
+    second (or sooner once `flush_bytes` are pending). Finished paragraphs are
+    rendered once into their own element; only the unfinished tail is re-rendered.
+    
+    Usage:
+        renderer = utils.StreamRenderer(output_container)
+        for chunk in stream:
+            renderer.write(chunk.text)
+        full_text = renderer.close()
+    """
+    def __init__(self, container, fps=8, flush_bytes=2000, cursor="▌"):
+        self.interval = 1.0 / fps
+        self.flush_bytes = flush_bytes
+        self.cursor = cursor
+        
+        root = container.container()
+        self._paragraphs = root.container()   # Finished paragraphs, appended once
+        self._tail = root.empty()             # Unfinished text, re-rendered each flush
+        
+        self._parts = []        # Every chunk (joined once at the end)
+        self._pending = []      # Chunks not yet part of a finished paragraph
+        self._unflushed = 0
+        self._last_flush = 0.0
+        
+        # Measurements
+        self.bytes_sent = 0
+        self.render_time = 0.0
+        self.flushes = 0
+
+    def write(self, text):
+        if not text:
+            return
+        self._parts.append(text)
+        self._pending.append(text)
+        self._unflushed += len(text)
+        
+        now = time.monotonic()
+        if now - self._last_flush >= self.interval or self._unflushed >= self.flush_bytes:
+            self._flush(now)
+
+    def _render(self, element, text):
+        started = time.perf_counter()
+        element.markdown(text)
+        self.render_time += time.perf_counter() - started
+        self.bytes_sent += len(text.encode("utf-8"))
+
+    def _split_finished(self, tail):
+        """Returns the index up to which `tail` holds complete paragraphs (outside code fences)."""
+        boundary = tail.rfind("\n\n")
+        while boundary > 0 and tail.count("```", 0, boundary) % 2:
+            boundary = tail.rfind("\n\n", 0, boundary)
+        return max(boundary, 0)
+
+    def _flush(self, now, final=False):
+        tail = "".join(self._pending)
+        
+        boundary = len(tail) if final else self._split_finished(tail)
+        if boundary:
+            finished = tail[:boundary]
+            if finished.strip():
+                self._render(self._paragraphs, finished)
+            tail = tail[boundary:].lstrip("\n")
+        
+        self._pending = [tail] if tail else []
+        self._unflushed = 0
+        self._last_flush = now
+        self.flushes += 1
+        
+        if final:
+            self._tail.empty()
+        else:
+            self._render(self._tail, tail + self.cursor)
+
+    @property
+    def text(self):
+        return "".join(self._parts)
+
+    def close(self):
+        """Final render without the cursor. Returns the full text."""
+        self._flush(time.monotonic(), final=True)
+        return self.text
+
+def poll_job(state_key, label, poll_interval=1.0, tail_chars=1500):
+    """
+    Follows a background job whose ID is stored in st.session_state[state_key].
+
+    While the job is queued/running, renders a progress panel inside a
+    fragment that reruns on its own every `poll_interval` seconds, so the
+    rest of the page (earlier results, metrics, widgets) keeps rendering.
+    Streamed output is shown as its last `tail_chars` characters only.
+    When the job finishes the fragment triggers one full rerun, and the
+    finished job record (status "done" or "failed") is returned exactly once.
+    Returns None while the job is running or if there is no job to follow.
+    """
+    job_id = st.session_state.get(state_key)
+    if not job_id:
+        return None
+    job = job_queue.get_queue().get(job_id)
+    if job is None:
+        st.session_state.pop(state_key, None)
+        return None
+
+    if job['status'] not in job_queue.ACTIVE:
+        st.session_state.pop(state_key, None)
+        return job
+
+    @st.fragment(run_every=poll_interval)
+    def job_panel():
+        job = job_queue.get_queue().get(job_id)
+        if job is None or job['status'] not in job_queue.ACTIVE:
+            st.rerun() # Full rerun: the caller picks up the finished job
+        
+        st.info(f"⏳ {label} ({job['elapsed']:.0f}s) · you can keep using the page; the job runs in the background.")
+        for message in job['messages'][-6:]:
+            st.caption(message)
+        if job['partial']:
+            # Only the tail is re-sent each tick, starting at a paragraph boundary when there is one
+            tail = job['partial'][-tail_chars:]
+            if len(job['partial']) > tail_chars:
+                boundary = tail.find("\n\n")
+                tail = "…\n\n" + (tail[boundary + 2:] if boundary >= 0 else tail)
+                st.caption(f"{len(job['partial'].split()):,} words so far")
+            st.markdown(tail + "▌")
+
+    job_panel()
+    return None
+
 def track_usage(platform_type):
     """
     Tracks usage stats in Session State.